@@ -0,0 +1,141 @@
+"""Database backends with health checked persistent connections and an optional pool.
+
+They extend Django's own backends through ``ConnectionReuseMixin`` and
+read two extra keys of the database settings: ``HEALTH_CHECKS`` pings a
+persistent connection before the first query of every request, and
+``POOL_SIZE`` keeps up to that many connections of the process open for
+the next request, handing them back to the pool when requests end.
+``CONN_MAX_AGE`` still limits how long a connection lives, counted from
+when it was opened, so pooled connections are recycled too.
+"""
+import threading
+import time
+from collections import deque
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Idle DB-API connections shared by all threads of the process."""
+
+    def __init__(self, size):
+        """Create empty pool keeping at most ``size`` connections."""
+        self.size = size
+        self.idle = deque()
+        self.lock = threading.Lock()
+
+    def take(self):
+        """Return ``(connection, close_at)`` of most recently used idle connection or None."""
+        with self.lock:
+            return self.idle.pop() if self.idle else None
+
+    def give_back(self, connection, close_at):
+        """Keep connection for later, or close it if the pool is full."""
+        with self.lock:
+            if len(self.idle) < self.size:
+                self.idle.append((connection, close_at))
+                return
+        connection.close()
+
+    def clear(self):
+        """Close all idle connections."""
+        while True:
+            idle = self.take()
+            if idle is None:
+                return
+            idle[0].close()
+
+
+def get_pool(alias, size):
+    """Return pool of the database alias, None if pooling is off."""
+    if not size:
+        return None
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(size)
+        return _pools[alias]
+
+
+def close_all():
+    """Close connections of the current thread and all pooled ones, e.g. before forking worker processes."""
+    from django.db import connections
+    for connection in connections.all():
+        connection.close()
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.clear()
+
+
+class ConnectionReuseMixin:
+    """Check persistent connections before reuse and take new ones from the pool."""
+
+    health_check_done = True
+
+    @property
+    def pool(self):
+        """Pool of this database, None if pooling is off."""
+        return get_pool(self.alias, self.settings_dict.get('POOL_SIZE', 0))
+
+    def ping(self, connection):
+        """Tell if DB-API connection still answers queries."""
+        try:
+            cursor = connection.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+        except self.Database.Error:
+            return False
+        return True
+
+    def get_new_connection(self, conn_params):
+        """Take a working connection from the pool before opening a new one."""
+        pool = self.pool
+        while pool is not None:
+            idle = pool.take()
+            if idle is None:
+                break
+            connection, close_at = idle
+            if not self._expired(close_at) and self.ping(connection):
+                # Pooled connection keeps the age it had, not the one ``connect`` has just set
+                self.close_at = close_at
+                return connection
+            connection.close()
+        return super().get_new_connection(conn_params)
+
+    def _expired(self, close_at):
+        """Tell if connection which has to be closed at ``close_at`` outlived ``CONN_MAX_AGE``."""
+        return close_at is not None and time.time() >= close_at
+
+    def connect(self):
+        """Connect, new connections need no health check."""
+        super().connect()
+        self.health_check_done = True
+
+    def _close(self):
+        """Give clean connections which are not too old back to the pool instead of closing them."""
+        pool = self.pool
+        if (pool is None or self.errors_occurred or self.in_atomic_block or not self.autocommit or
+                self._expired(self.close_at)):
+            return super()._close()
+        pool.give_back(self.connection, self.close_at)
+
+    def close_if_unusable_or_obsolete(self):
+        """Close connection as usual at request boundaries, and check it before next query if it stays.
+
+        With a pool the connection is handed back to it, so other threads can use it.
+        """
+        super().close_if_unusable_or_obsolete()
+        if self.connection is not None and self.pool is not None and not self.in_atomic_block:
+            self.close()
+        if self.connection is not None and self.settings_dict.get('HEALTH_CHECKS'):
+            self.health_check_done = False
+
+    def ensure_connection(self):
+        """Replace persistent connection which stopped working, e.g. after database restart."""
+        if self.connection is not None and not self.health_check_done and not self.in_atomic_block:
+            self.health_check_done = True
+            if not self.ping(self.connection):
+                self.errors_occurred = True
+                self.close()
+        super().ensure_connection()
@@ -0,0 +1 @@
+"""Do not write anything here."""
@@ -0,0 +1,8 @@
+"""PostgreSQL backend with connection health checks and pool."""
+from django.db.backends.postgresql import base
+
+from blog.backends import ConnectionReuseMixin
+
+
+class DatabaseWrapper(ConnectionReuseMixin, base.DatabaseWrapper):
+    """PostgreSQL connection wrapper."""
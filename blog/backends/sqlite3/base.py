@@ -0,0 +1,8 @@
+"""SQLite backend with connection health checks and pool."""
+from django.db.backends.sqlite3 import base
+
+from blog.backends import ConnectionReuseMixin
+
+
+class DatabaseWrapper(ConnectionReuseMixin, base.DatabaseWrapper):
+    """SQLite connection wrapper."""
@@ -0,0 +1,30 @@
+"""Gunicorn configuration, run as ``gunicorn -c blog/gunicorn_conf.py blog.wsgi``.
+
+The application is imported once by the master process and workers are
+forked from it, sharing its memory pages until they write to them, see
+``manage.py profile_startup`` for what the import costs. Workers are
+replaced after serving ``max_requests`` requests, so memory they leak or
+fragment is given back; the jitter keeps them from restarting at once.
+"""
+import multiprocessing
+
+import environ
+
+env = environ.Env()
+
+preload_app = env.bool('GUNICORN_PRELOAD', default=True)
+# WEB_CONCURRENCY is set by Heroku to fit memory of the dyno
+workers = env.int('WEB_CONCURRENCY', default=multiprocessing.cpu_count() * 2 + 1)
+# E.g. gthread with GUNICORN_THREADS, or gevent once it is installed
+worker_class = env('GUNICORN_WORKER_CLASS', default='sync')
+threads = env.int('GUNICORN_THREADS', default=1)
+max_requests = env.int('GUNICORN_MAX_REQUESTS', default=1000)
+max_requests_jitter = env.int('GUNICORN_MAX_REQUESTS_JITTER', default=100)
+timeout = env.int('GUNICORN_TIMEOUT', default=30)
+
+
+def pre_fork(server, worker):
+    """Keep database connections opened while preloading out of workers, which would share their sockets."""
+    if preload_app:
+        from blog.backends import close_all
+        close_all()
@@ -15,7 +15,10 @@ SECRET_KEY = env('SECRET_KEY', default='u1^ao$3(lwk%g+i6+_)-e(1-f%^56dqq&0$*zlug
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = env('DEBUG')
 
-ALLOWED_HOSTS = ['*']
+ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', default=['*'])
+
+# Scheme and host used in absolute links, e.g. in feeds; taken from requests if empty
+SITE_URL = env('SITE_URL', default='')
 
 ADMIN_EMAIL = env('ADMIN_EMAIL', default='admin@example.com')
 
@@ -29,15 +32,18 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'common',
-    'main',
+    'main.apps.MainConfig',
 ]
 
 MIDDLEWARE_CLASSES = [
+    'main.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'main.middleware.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -70,6 +76,96 @@ DATABASES = {
     'default':  env.db(default='sqlite:///db.sqlite3'),
 }
 
+# Read-only replicas, e.g. DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3 next to
+# DATABASE_URL=sqlite:///db.sqlite3 locally; tests read from the test primary instead
+REPLICA_DATABASES = []
+for number, url in enumerate(env.list('DATABASE_REPLICA_URLS', default=[]), 1):
+    REPLICA_DATABASES.append('replica{}'.format(number))
+    DATABASES[REPLICA_DATABASES[-1]] = dict(env.db_url_config(url), TEST={'MIRROR': 'default'})
+
+# Keep anonymous clients on the primary for this many seconds after they wrote something
+REPLICA_STICKY_SECONDS = env.int('REPLICA_STICKY_SECONDS', default=10)
+REPLICA_STICKY_COOKIE = 'primary'
+
+DATABASE_ROUTERS = ['main.routers.ReplicaRouter']
+
+# Seconds a connection stays open for next requests (0 closes it after every request),
+# whether such connection is checked before reuse, and how many connections every process
+# keeps open in its pool between requests, using backends which support these options
+for database in DATABASES.values():
+    database.update({
+        'CONN_MAX_AGE': env.int('CONN_MAX_AGE', default=60),
+        'HEALTH_CHECKS': env.bool('DB_HEALTH_CHECKS', default=True),
+        'POOL_SIZE': env.int('DB_POOL_SIZE', default=0),
+        'ENGINE': {
+            'django.db.backends.postgresql': 'blog.backends.postgresql',
+            'django.db.backends.postgresql_psycopg2': 'blog.backends.postgresql',
+            'django.db.backends.sqlite3': 'blog.backends.sqlite3',
+        }.get(database['ENGINE'], database['ENGINE']),
+    })
+
+
+# Cache
+# https://docs.djangoproject.com/en/1.9/topics/cache/
+
+# Web workers, run_jobs and run_scheduler processes have to share the cache, e.g.
+# CACHE_URL=memcache://127.0.0.1:11211, local memory cache is good for development only
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Seconds anonymous pages stay cached, 0 disables the page cache. It is off by default without
+# CACHE_URL outside of development, see check main.E001.
+PAGE_CACHE_TIMEOUT = env.int('PAGE_CACHE_TIMEOUT', default=600 if DEBUG or 'CACHE_URL' in env.ENVIRON else 0)
+
+# Sessions are read from the shared cache and written through to the database, so authenticated
+# requests skip the session query; django.contrib.sessions.backends.signed_cookies keeps them
+# in clients' cookies instead. Without a shared cache they are read from the database.
+SESSION_ENGINE = env('SESSION_ENGINE', default='django.contrib.sessions.backends.{}'.format(
+    'db' if CACHES['default']['BACKEND'].endswith(('LocMemCache', 'DummyCache')) else 'cached_db'))
+
+
+# Request profiling: share of requests measured, amount of slowest queries logged
+# and how many times a query shape has to repeat within a request to be reported
+REQUEST_PROFILING_SAMPLE_RATE = env.float('REQUEST_PROFILING_SAMPLE_RATE', default=0.0)
+REQUEST_PROFILING_SLOWEST = env.int('REQUEST_PROFILING_SLOWEST', default=3)
+REQUEST_PROFILING_REPEAT_THRESHOLD = env.int('REQUEST_PROFILING_REPEAT_THRESHOLD', default=5)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'main': {
+            'handlers': ['console'],
+            'level': env('MAIN_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
+
+
+# Background jobs, JOBS_SYNC runs them right away instead of storing for run_jobs worker
+JOBS_SYNC = env.bool('JOBS_SYNC', default=DEBUG)
+JOBS_MAX_ATTEMPTS = env.int('JOBS_MAX_ATTEMPTS', default=5)
+JOBS_RETRY_DELAY = env.int('JOBS_RETRY_DELAY', default=10)
+JOBS_TIMEOUT = env.int('JOBS_TIMEOUT', default=600)
+
+
+# Rate limits of POST requests as (burst, tokens refilled per minute), None disables a limit
+RATE_LIMITS = {
+    'comment_ip': (5, 2),
+    'comment_post': (30, 10),
+    'login_ip': (10, 5),
+}
+# Amount of proxies in front of the site appending to X-Forwarded-For, e.g. 1 on Heroku. Clients are told
+# apart by the address the outermost of them has appended; with 0 the header, which clients can send
+# themselves, is ignored and REMOTE_ADDR is used.
+RATE_LIMIT_TRUSTED_PROXIES = env.int('RATE_LIMIT_TRUSTED_PROXIES', default=0)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/1.10/ref/settings/#auth-password-validators
@@ -105,11 +201,29 @@ USE_TZ = True
 
 LOGIN_REDIRECT_URL = '/'
 
+POSTS_PER_PAGE = env.int('POSTS_PER_PAGE', default=10)
+COMMENTS_PER_PAGE = env.int('COMMENTS_PER_PAGE', default=50)
+MODERATION_PAGE_SIZE = env.int('MODERATION_PAGE_SIZE', default=200)
+# Admin lists of tables with more rows than this take their size from database statistics instead of COUNT(*)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = env.int('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=100000)
+FEED_ITEMS = env.int('FEED_ITEMS', default=20)
+API_PAGE_SIZE = env.int('API_PAGE_SIZE', default=20)
+API_MAX_PAGE_SIZE = env.int('API_MAX_PAGE_SIZE', default=100)
+
+# Full-text search, SEARCH_CONFIG is PostgreSQL text search configuration
+SEARCH_CONFIG = env('SEARCH_CONFIG', default='english')
+SEARCH_MAX_RESULTS = env.int('SEARCH_MAX_RESULTS', default=500)
+SEARCH_RESULTS_PER_PAGE = env.int('SEARCH_RESULTS_PER_PAGE', default=10)
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/1.10/howto/static-files/
 
 STATIC_URL = '/static/'
 STATIC_ROOT_DIR = env.path('STATIC_ROOT', BASE_DIR('static'))
 STATIC_ROOT = STATIC_ROOT_DIR()
+STATICFILES_STORAGE = 'blog.storage.StaticFilesStorage'
+
+# Put css/critical.css into every page and load other stylesheets without blocking its first paint
+CRITICAL_CSS = env.bool('CRITICAL_CSS', default=False)
 
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
@@ -0,0 +1,13 @@
+"""Settings for running tests fast, e.g. ``manage.py test --settings=blog.settings_test``."""
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+# Passwords of test users need no protection against brute force
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Tests run against SQLite database in memory whatever DATABASE_URL is, without replicas
+DATABASES = {
+    'default': dict(DATABASES['default'], ENGINE='blog.backends.sqlite3', NAME=':memory:',
+                    HOST='', PORT='', USER='', PASSWORD='', OPTIONS={}),
+}
+REPLICA_DATABASES = []
@@ -0,0 +1,18 @@
+"""Storage of collected static files."""
+from django.core.files.storage import FileSystemStorage
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """Collect files under names with hashes of their contents, next to their gzip and brotli variants.
+
+    WhiteNoise serves such files with far-future expiry. Until
+    ``collectstatic`` writes the manifest, e.g. in tests, files are
+    referred to by their plain names.
+    """
+
+    def url(self, name, force=False):
+        """Return URL of the hashed file, of the plain one if nothing was collected yet."""
+        if not force and not self.hashed_files:
+            return FileSystemStorage.url(self, name)
+        return super().url(name, force)
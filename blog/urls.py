@@ -3,9 +3,11 @@ from django.conf.urls import url, include
 from django.contrib import admin
 from django.contrib.auth import views
 
+from main.ratelimit import client_ip, rate_limit
+
 urlpatterns = [
     url(r'^admin/', admin.site.urls),
-    url(r'^accounts/login/$', views.login, name='login'),
+    url(r'^accounts/login/$', rate_limit(('login_ip', client_ip))(views.login), name='login'),
     url(r'^accounts/logout/$', views.logout, name='logout', kwargs={'next_page': '/'}),
     url(r'', include('main.urls')),
 ]
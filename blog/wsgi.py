@@ -1,12 +1,9 @@
 """WSGI config for blog project."""
 
 import os
-from whitenoise.django import DjangoWhiteNoise
 
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog.settings')
 
 application = get_wsgi_application()
-
-application = DjangoWhiteNoise(application)
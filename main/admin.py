@@ -4,8 +4,87 @@ Here we add models to admin panel and after manage it from our site
 You can register it or if you want change some setting, hot to show
 what info you want to see on display about this model
 """
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+
 from .models import Post, Comment
 
-admin.site.register(Post)
-admin.site.register(Comment)
+
+def estimated_count(model, using):
+    """Return amount of rows in the model's table according to planner statistics, None if unknown."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        try:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [table])
+            elif connection.vendor == 'sqlite':
+                # Filled by ANALYZE, the first number of every row is amount of rows in the table
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            else:
+                return None
+        except DatabaseError:
+            return None
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return int(float(str(row[0]).split()[0]))
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator which does not count rows of big unfiltered tables, taking statistics of the database instead.
+
+    Filtered lists are counted exactly, as filters are backed by indexes.
+    """
+
+    def _get_count(self):
+        """Return estimate when it is above ``ADMIN_ESTIMATED_COUNT_THRESHOLD``, exact amount otherwise."""
+        if self._count is None and not self.object_list.query.where:
+            estimate = estimated_count(self.object_list.model, self.object_list.db)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                self._count = estimate
+        return super()._get_count()
+    count = property(_get_count)
+
+
+class BigTableAdmin(admin.ModelAdmin):
+    """Changelist of a table which may grow to millions of rows."""
+
+    paginator = EstimatedCountPaginator
+    # Filtered lists would count the whole table once more for "N total"
+    show_full_result_count = False
+
+
+@admin.register(Post)
+class PostAdmin(BigTableAdmin):
+    """Posts with their authors and comment counters."""
+
+    list_display = ('title', 'author', 'published_date', 'comment_count', 'approved_comment_count')
+    list_select_related = ('author',)
+    list_filter = ('published_date',)
+    date_hierarchy = 'published_date'
+    raw_id_fields = ('author',)
+
+
+@admin.register(Comment)
+class CommentAdmin(BigTableAdmin):
+    """Comments with bulk moderation, which keeps counters of their posts right."""
+
+    list_display = ('author', 'post', 'created_date', 'is_approved')
+    list_select_related = ('post',)
+    list_filter = ('is_approved',)
+    date_hierarchy = 'created_date'
+    raw_id_fields = ('post',)
+    actions = ['approve_comments']
+
+    def get_queryset(self, request):
+        """Join posts without their texts, only titles are shown."""
+        return super().get_queryset(request).select_related('post').defer('post__text', 'post__text_html')
+
+    def approve_comments(self, request, queryset):
+        """Approve all selected comments at once."""
+        approved = queryset.approve()
+        self.message_user(request, 'Approved {} comment(s).'.format(approved))
+    approve_comments.short_description = 'Approve selected comments'
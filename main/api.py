@@ -0,0 +1,180 @@
+"""Read-only JSON API for published posts and their approved comments.
+
+Lists are paginated with cursors of ``main.pagination`` and streamed one
+object at a time. ``?fields=id,title`` limits both the output and the
+selected columns, and ``?limit=`` sets the page size.
+"""
+import json
+from collections import OrderedDict
+from hashlib import md5
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.views.generic import View
+
+from .conditional import post_etag, post_last_modified, post_list_etag, post_list_last_modified
+from .models import Comment, Post
+from .pagination import decode_cursor, paginate_keyset
+
+# Names of fields in the API and attributes they are read from
+POST_FIELDS = OrderedDict([
+    ('id', 'pk'),
+    ('title', 'title'),
+    ('author', 'author.username'),
+    ('excerpt', 'excerpt'),
+    ('text', 'text'),
+    ('html', 'text_html'),
+    ('published_date', 'published_date'),
+    ('updated_at', 'updated_at'),
+    ('comment_count', 'approved_comment_count'),
+])
+COMMENT_FIELDS = OrderedDict([
+    ('id', 'pk'),
+    ('author', 'author'),
+    ('text', 'text'),
+    ('created_date', 'created_date'),
+])
+# Full texts are left out of lists unless asked for
+POST_LIST_FIELDS = [name for name in POST_FIELDS if name not in ('text', 'html')]
+
+_encoder = DjangoJSONEncoder()
+
+
+class BadRequest(ValueError):
+    """Request parameters are invalid, answered with 400 and the error message."""
+
+
+class FieldError(BadRequest):
+    """Requested field does not exist."""
+
+
+def _serialize(obj, fields):
+    """Return JSON object with the fields of the model instance."""
+    data = OrderedDict()
+    for name, path in fields.items():
+        value = obj
+        for attribute in path.split('.'):
+            value = getattr(value, attribute)
+        data[name] = value
+    return _encoder.encode(data)
+
+
+def _path_etag(etag_func):
+    """Make ETag of an HTML page different for every API URL showing the same content."""
+    def etag(request, **kwargs):
+        tag = etag_func(request, **kwargs)
+        return tag and md5('{} {}'.format(request.get_full_path(), tag).encode()).hexdigest()
+    return etag
+
+
+class ApiView(View):
+    """Select and serialize the fields requested by the caller."""
+
+    replica_reads = True
+    fields = POST_FIELDS
+    default_fields = POST_FIELDS
+
+    def dispatch(self, request, *args, **kwargs):
+        """Answer with 400 for invalid parameters."""
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except BadRequest as error:
+            return JsonResponse({'error': str(error)}, status=400)
+
+    def get_fields(self):
+        """Return ``{name: attribute}`` of fields requested with ``?fields=``."""
+        requested = self.request.GET.get('fields')
+        names = [name for name in requested.split(',') if name] if requested else self.default_fields
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise FieldError('Unknown fields: {}.'.format(', '.join(unknown)))
+        return OrderedDict((name, self.fields[name]) for name in names)
+
+    def restrict(self, queryset, fields, *required):
+        """Select only columns of the fields, joining related models they come from."""
+        paths = [path.replace('.', '__') for path in fields.values() if path != 'pk'] + list(required)
+        related = [path.split('__')[0] for path in paths if '__' in path]
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*paths)
+
+
+class ApiListView(ApiView):
+    """Stream one cursor-paginated page of objects.
+
+    Subclasses set ``keyset_field`` and define ``get_queryset`` returning
+    all objects of the list.
+    """
+
+    keyset_field = None
+    keyset_descending = True
+
+    def get(self, request, *args, **kwargs):
+        """Fetch one page and stream it as JSON."""
+        fields = self.get_fields()
+        try:
+            limit = min(int(request.GET.get('limit', settings.API_PAGE_SIZE)), settings.API_MAX_PAGE_SIZE)
+        except ValueError:
+            raise BadRequest('Invalid limit.')
+        for name in ('after', 'before'):
+            if request.GET.get(name):
+                try:
+                    decode_cursor(request.GET[name])
+                except Http404:
+                    raise BadRequest('Invalid cursor.')
+        page = paginate_keyset(self.restrict(self.get_queryset(), fields, self.keyset_field), self.keyset_field,
+                               max(limit, 1), after=request.GET.get('after'), before=request.GET.get('before'),
+                               descending=self.keyset_descending)
+        return StreamingHttpResponse(self.stream(page, fields), content_type='application/json')
+
+    def stream(self, page, fields):
+        """Yield JSON of the page piece by piece."""
+        yield '{{"next": {}, "previous": {}, "results": ['.format(json.dumps(page.next_cursor),
+                                                                  json.dumps(page.previous_cursor))
+        for number, obj in enumerate(page):
+            yield (',' if number else '') + _serialize(obj, fields)
+        yield ']}'
+
+
+@method_decorator(condition(etag_func=post_list_etag, last_modified_func=post_list_last_modified), name='dispatch')
+class PostListApi(ApiListView):
+    """Published posts, newest first."""
+
+    default_fields = POST_LIST_FIELDS
+    keyset_field = 'published_date'
+
+    def get_queryset(self):
+        """Return published posts."""
+        return Post.objects.published()
+
+
+@method_decorator(condition(etag_func=_path_etag(post_etag), last_modified_func=post_last_modified),
+                  name='dispatch')
+class PostDetailApi(ApiView):
+    """One published post."""
+
+    def get(self, request, pk):
+        """Return the post with requested fields."""
+        fields = self.get_fields()
+        post = get_object_or_404(self.restrict(Post.objects.published(), fields), pk=pk)
+        return HttpResponse(_serialize(post, fields), content_type='application/json')
+
+
+@method_decorator(condition(etag_func=_path_etag(post_etag), last_modified_func=post_last_modified),
+                  name='dispatch')
+class CommentListApi(ApiListView):
+    """Approved comments of a published post, oldest first."""
+
+    fields = COMMENT_FIELDS
+    default_fields = COMMENT_FIELDS
+    keyset_field = 'created_date'
+    keyset_descending = False
+
+    def get_queryset(self):
+        """Return approved comments of the post."""
+        post = get_object_or_404(Post.objects.published().only('pk'), pk=self.kwargs['pk'])
+        return Comment.objects.filter(post=post, is_approved=True)
@@ -6,3 +6,7 @@ class MainConfig(AppConfig):
     """Configuration."""
 
     name = 'main'
+
+    def ready(self):
+        """Register system checks."""
+        from . import checks  # noqa: F401
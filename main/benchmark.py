@@ -0,0 +1,141 @@
+"""Performance benchmark of the main views.
+
+Synthetic blogs of growing size are seeded into the database, every view
+is requested through the test client, and latency percentiles, query
+counts and peak memory are compared with budgets checked in next to this
+module.
+"""
+import json
+import os
+import random
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from .models import Comment, Post
+from .pagination import encode_cursor
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), 'benchmark_budgets.json')
+DRAFT_RATIO = 0.1
+
+
+def seed(size, batch_size=2000):
+    """Top posts up to ``size``, with comments following a long-tailed distribution.
+
+    Most posts get a couple of comments while a few get hundreds, like
+    real blogs do. Counters are filled in directly instead of being
+    maintained one comment at a time.
+    """
+    author, _ = User.objects.get_or_create(username='benchmark')
+    existing = Post.objects.count()
+    random.seed(size)
+    now = timezone.now()
+    for start in range(existing, size, batch_size):
+        posts = []
+        for number in range(start, min(start + batch_size, size)):
+            created = now - timedelta(minutes=size - number)
+            post = Post(author=author, title='Post {}'.format(number), text='Lorem ipsum dolor sit amet.\n' * 50,
+                        created_date=created, published_date=None if random.random() < DRAFT_RATIO else created)
+            post.text_html, post.excerpt = post.render_text(), post.make_excerpt()
+            post.comment_count = min(int(random.paretovariate(1.2)) - 1, 1000)
+            post.approved_comment_count = post.comment_count // 2
+            posts.append(post)
+        with transaction.atomic():
+            last_pk = Post.objects.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+            Post.objects.bulk_create(posts)
+            created_posts = Post.objects.filter(pk__gt=last_pk).values_list('pk', 'created_date', 'comment_count')
+            Comment.objects.bulk_create(
+                Comment(post_id=pk, author='reader', text='Nice post!', created_date=created,
+                        is_approved=number % 2 == 0)
+                for pk, created, count in created_posts for number in range(count)
+            )
+
+
+def scenarios():
+    """Return ``(name, url, needs_login)`` of every benchmarked page for current data."""
+    published = Post.objects.published().order_by('-published_date', '-pk')
+    middle = published[published.count() // 2]
+    busiest = published.order_by('-comment_count').first()
+    return [
+        ('post_list', reverse('post_list'), False),
+        ('post_list_deep', '{}?after={}'.format(reverse('post_list'), encode_cursor(middle.published_date, middle.pk)),
+         False),
+        ('post_detail', reverse('post_detail', kwargs={'pk': busiest.pk}), False),
+        ('post_detail_author', reverse('post_detail', kwargs={'pk': busiest.pk}), True),
+        ('post_draft_list', reverse('post_draft_list'), True),
+    ]
+
+
+def percentile(values, share):
+    """Return value below which ``share`` of sorted ``values`` lie."""
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+def measure(url, client, requests):
+    """Request ``url`` repeatedly and describe how expensive it was."""
+    client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    # Captured queries are read from connection lazily, and next requests reset its log
+    query_count = len(queries)
+    if response.status_code != 200:
+        raise AssertionError('{} answered with {}'.format(url, response.status_code))
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    tracemalloc.start()
+    client.get(url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'queries': query_count,
+        'p50_ms': round(percentile(timings, 0.5), 2),
+        'p99_ms': round(percentile(timings, 0.99), 2),
+        'peak_kb': round(peak / 1024),
+    }
+
+
+def run(sizes, requests, report=print):
+    """Benchmark every scenario for each size and return ``{size: {scenario: results}}``."""
+    results = {}
+    user = User.objects.filter(is_superuser=True).first() or User.objects.create_superuser(
+        'benchmark-admin', 'admin@example.com', 'benchmark')
+    anonymous, author = Client(), Client()
+    author.force_login(user)
+    for size in sorted(sizes):
+        seed(size)
+        results[size] = {}
+        for name, url, needs_login in scenarios():
+            results[size][name] = measure(url, author if needs_login else anonymous, requests)
+            report('{:>8} {:<20} {}'.format(size, name, results[size][name]))
+    return results
+
+
+def load_budgets(path=BUDGETS_PATH):
+    """Read budgets of scenarios from JSON file."""
+    with open(path) as budgets:
+        return json.load(budgets)
+
+
+def over_budget(results, budgets):
+    """Return descriptions of every metric that exceeded its budget."""
+    failures = []
+    for size, scenarios_results in sorted(results.items()):
+        for name, metrics in sorted(scenarios_results.items()):
+            for metric, limit in sorted(budgets.get(name, {}).items()):
+                if metrics[metric] > limit:
+                    failures.append('{} at {} posts: {} is {}, budget is {}'.format(
+                        name, size, metric, metrics[metric], limit))
+    return failures
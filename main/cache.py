@@ -0,0 +1,118 @@
+"""Full-page cache for anonymous readers.
+
+Cached pages are keyed on version counters which are bumped whenever
+content they show changes, so stale pages are never looked up again and
+simply expire from the cache backend. Changes of posts also keep all
+readers on the primary database for ``REPLICA_STICKY_SECONDS``, so pages
+cached under new versions are not rendered from replicas lagging behind.
+Comments change too often for that, their authors are kept on the
+primary by a cookie of ``ReplicaMiddleware`` instead.
+"""
+from functools import wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe, unquote_etag
+
+LIST_VERSION = 'main:version:posts'
+# Time the post list changed last, as removed posts leave no dates behind in the database
+LIST_CHANGED = 'main:changed:posts'
+RECENT_CHANGE = 'main:changed'
+
+
+def post_version(pk):
+    """Return name of the version counter of a single post."""
+    return 'main:version:post:{}'.format(pk)
+
+
+def get_versions(*keys):
+    """Return current values of version counters, starting missing ones from 1."""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, 1, None)
+            versions[key] = cache.get(key, 1)
+    return [versions[key] for key in keys]
+
+
+def bump(*keys, pin_primary=False):
+    """Increase version counters so pages cached under old values are not used anymore.
+
+    With ``pin_primary`` all readers stay on the primary until replicas catch up.
+    """
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+    if LIST_VERSION in keys:
+        cache.set(LIST_CHANGED, timezone.now(), None)
+    if pin_primary:
+        cache.set(RECENT_CHANGE, True, settings.REPLICA_STICKY_SECONDS)
+
+
+def list_changed_at():
+    """Return time the post list was changed last, None if it is not known."""
+    return cache.get(LIST_CHANGED)
+
+
+def recently_changed():
+    """Tell if content changed so recently that replicas may not have the change yet."""
+    return cache.get(RECENT_CHANGE, False)
+
+
+def bump_post(pk, comments_only=False):
+    """Invalidate cached pages showing the post: its detail page and post list.
+
+    Pass ``comments_only`` when only comments of the post have changed,
+    which does not keep other readers off replicas.
+    """
+    bump(LIST_VERSION, post_version(pk), pin_primary=not comments_only)
+
+
+def cache_for_anonymous(version_keys, vary_on_host=False):
+    """Decorate a view to cache its successful GET responses for anonymous users.
+
+    ``version_keys`` is called with view kwargs and returns names of the
+    version counters the page depends on. Pages are keyed on path and
+    pagination cursors, and on host too with ``vary_on_host`` for pages
+    containing absolute URLs. Cached ETag and Last-Modified headers are
+    still honoured, so place it above ``condition``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated() or not settings.PAGE_CACHE_TIMEOUT:
+                return view(request, *args, **kwargs)
+            versions = get_versions(*version_keys(**kwargs))
+            # Unknown parameters are left out, so they cannot be used to flood the cache
+            page = '{}{}?after={}&before={}'.format(request.get_host() if vary_on_host else '', request.path,
+                                                    request.GET.get('after', ''), request.GET.get('before', ''))
+            url_hash = md5(page.encode()).hexdigest()
+            key = 'main:page:{}:{}'.format(url_hash, '.'.join(str(version) for version in versions))
+            response = cache.get(key)
+            if response is not None:
+                return _conditional(request, response)
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                if hasattr(response, 'render'):
+                    response.add_post_render_callback(lambda r: cache.set(key, r, settings.PAGE_CACHE_TIMEOUT))
+                else:
+                    cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+def _conditional(request, response):
+    """Answer with 304 if the client already has the cached response."""
+    etag = response.get('ETag')
+    last_modified = response.get('Last-Modified')
+    if not etag and not last_modified:
+        return response
+    return get_conditional_response(request, etag=unquote_etag(etag) if etag else None,
+                                    last_modified=parse_http_date_safe(last_modified) if last_modified else None,
+                                    response=response)
@@ -0,0 +1,47 @@
+"""System checks of the project settings."""
+from django.conf import settings
+from django.core.checks import Error, register
+
+LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register('caches')
+def check_shared_cache(app_configs, **kwargs):
+    """Refuse page cache kept in every process separately outside of development.
+
+    Web workers, ``run_jobs`` and ``run_scheduler`` bump version counters
+    of cached pages, so they have to share one cache to see each other's bumps.
+    """
+    if settings.DEBUG or not settings.PAGE_CACHE_TIMEOUT or settings.CACHES['default']['BACKEND'] not in LOCAL_CACHES:
+        return []
+    return [Error(
+        'Page cache is enabled with a cache local to every process.',
+        hint='Set CACHE_URL to a shared cache such as memcached, or disable page cache with PAGE_CACHE_TIMEOUT=0.',
+        id='main.E001',
+    )]
+
+
+CACHED_SESSIONS = (
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+@register('caches')
+def check_session_cache(app_configs, **kwargs):
+    """Refuse sessions cached in every process separately outside of development.
+
+    A session ended by logout in one process would stay valid in the
+    caches of other processes until it expires.
+    """
+    if settings.DEBUG or settings.SESSION_ENGINE not in CACHED_SESSIONS or \
+            settings.CACHES['default']['BACKEND'] not in LOCAL_CACHES:
+        return []
+    return [Error(
+        'Sessions are cached in a cache local to every process.',
+        hint='Set CACHE_URL to a shared cache such as memcached, or SESSION_ENGINE to a backend without cache.',
+        id='main.E002',
+    )]
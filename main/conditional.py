@@ -0,0 +1,89 @@
+"""ETag and Last-Modified calculation for ``django.views.decorators.http.condition``.
+
+Every function here is cheap: it looks at change dates of posts using
+indexes only, so a 304 is answered before any page rendering.
+"""
+from hashlib import md5
+
+from django.utils import timezone
+
+from .cache import LIST_VERSION, get_versions, list_changed_at
+from .models import Post
+
+
+def _viewer(request):
+    """Return part of the ETag describing whom the page is rendered for."""
+    return 'user{}'.format(request.user.pk) if request.user.is_authenticated() else 'anon'
+
+
+def _newest(*dates):
+    """Return the latest of dates which are set."""
+    return max((date for date in dates if date is not None), default=None)
+
+
+def _post_state(request, pk):
+    """Return change dates and publishing date of the post, fetched once per request."""
+    if not hasattr(request, '_post_state'):
+        request._post_state = Post.objects.filter(pk=pk).values_list(
+            'updated_at', 'comments_updated_at', 'published_date').first()
+    return request._post_state
+
+
+def _is_live(published_date):
+    """Tell if post with the publishing date is visible for readers now.
+
+    Scheduled posts go live without any change of their rows, so the
+    moment is accounted for separately.
+    """
+    return published_date is not None and published_date <= timezone.now()
+
+
+def post_etag(request, pk):
+    """Identify version of the post page including its comments."""
+    state = _post_state(request, pk)
+    if state is None:
+        return None
+    updated_at, comments_updated_at, published_date = state
+    dates = '-'.join(str(date and date.timestamp()) for date in (updated_at, comments_updated_at))
+    return 'post-{}-{}-{}-{}'.format(pk, dates, 'live' if _is_live(published_date) else 'hidden', _viewer(request))
+
+
+def post_last_modified(request, pk):
+    """Return time the post or any of its comments was changed last, or it went live if that is later."""
+    state = _post_state(request, pk)
+    if state is None or request.user.is_authenticated():
+        # Logging in changes the page without changing the post
+        return None
+    updated_at, comments_updated_at, published_date = state
+    return _newest(updated_at, comments_updated_at, published_date if _is_live(published_date) else None)
+
+
+def _list_state(request):
+    """Return dates describing the post list, fetched once per request."""
+    if not hasattr(request, '_list_state'):
+        newest_post = Post.objects.published().order_by('-published_date').values_list('published_date', flat=True)
+        updated = Post.objects.order_by('-updated_at').values_list('updated_at', flat=True)
+        commented = Post.objects.exclude(comments_updated_at=None).order_by('-comments_updated_at').values_list(
+            'comments_updated_at', flat=True)
+        request._list_state = (newest_post.first(), updated.first(), commented.first())
+    return request._list_state
+
+
+def post_list_etag(request):
+    """Identify version of the post list page."""
+    dates = '-'.join(str(date and date.timestamp()) for date in _list_state(request))
+    version, = get_versions(LIST_VERSION)
+    tag = '{}-{}-{}-{}'.format(request.get_full_path(), dates, version, _viewer(request))
+    return 'posts-' + md5(tag.encode()).hexdigest()
+
+
+def post_list_last_modified(request):
+    """Return time the newest post was published or the list changed last, None if it is not known.
+
+    Deleted posts leave no dates in the database, so the time of the last
+    change is taken from the cache and nothing is promised without it.
+    """
+    changed_at = list_changed_at()
+    if request.user.is_authenticated() or changed_at is None:
+        return None
+    return _newest(changed_at, *_list_state(request))
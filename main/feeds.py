@@ -0,0 +1,75 @@
+"""RSS and Atom feeds of recent posts."""
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.urlresolvers import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.views.decorators.http import condition
+
+from .cache import LIST_VERSION, cache_for_anonymous
+from .conditional import post_list_etag, post_list_last_modified
+from .models import Post
+
+
+class LatestPostsFeed(Feed):
+    """RSS feed with excerpts of the newest published posts."""
+
+    title = 'Django Girls Blog'
+    url_name = 'post_feed_rss'
+    description = 'Latest posts.'
+
+    def link(self):
+        """Return address of the post list."""
+        return settings.SITE_URL + reverse('post_list')
+
+    def feed_url(self):
+        """Return address of the feed itself."""
+        return settings.SITE_URL + reverse(self.url_name)
+
+    def items(self):
+        """Return newest posts the same way post list shows them."""
+        return Post.objects.listed().select_related('author').order_by('-published_date', '-pk')[:settings.FEED_ITEMS]
+
+    def item_title(self, item):
+        """Return title of the post."""
+        return item.title
+
+    def item_description(self, item):
+        """Return stored excerpt instead of the full text."""
+        return item.excerpt
+
+    def item_link(self, item):
+        """Return address of the post."""
+        return settings.SITE_URL + reverse('post_detail', kwargs={'pk': item.pk})
+
+    def item_author_name(self, item):
+        """Return name of the author."""
+        return item.author.username
+
+    def item_pubdate(self, item):
+        """Return date the post was published."""
+        return item.published_date
+
+    def item_updateddate(self, item):
+        """Return date the post was changed last."""
+        return item.updated_at
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    """Atom variant of the feed."""
+
+    feed_type = Atom1Feed
+    url_name = 'post_feed_atom'
+    subtitle = LatestPostsFeed.description
+
+
+def feed_view(feed):
+    """Wrap feed into the page cache and conditional GET of post list, reading from replicas."""
+    # Links include the requested host unless SITE_URL is set
+    view = cache_for_anonymous(lambda **kwargs: [LIST_VERSION], vary_on_host=not settings.SITE_URL)(
+        condition(etag_func=post_list_etag, last_modified_func=post_list_last_modified)(feed))
+    view.replica_reads = True
+    return view
+
+
+rss = feed_view(LatestPostsFeed())
+atom = feed_view(LatestPostsAtomFeed())
@@ -8,7 +8,14 @@ class PostForm(forms.ModelForm):
 
     class Meta:
         model = Post
-        fields = ('title', 'text')
+        fields = ('title', 'text', 'published_date')
+        help_texts = {'published_date': 'Leave empty to keep the post a draft, set a future date to schedule it.'}
+
+
+class PublishForm(forms.Form):
+    """Time to publish a post at, now if not given."""
+
+    published_date = forms.DateTimeField(required=False)
 
 
 class CommentForm(forms.ModelForm):
@@ -17,3 +24,13 @@ class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ('author', 'text')
+
+
+class ModerationForm(forms.Form):
+    """Comments chosen in moderation queue and what to do with them."""
+
+    APPROVE = 'approve'
+    DELETE = 'delete'
+
+    action = forms.ChoiceField(choices=((APPROVE, 'Approve'), (DELETE, 'Delete')))
+    comments = forms.ModelMultipleChoiceField(queryset=Comment.objects.only('pk'))
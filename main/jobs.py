@@ -0,0 +1,104 @@
+"""Background jobs stored in the database.
+
+Functions decorated with ``task`` get a ``delay`` method which stores a
+``Job`` row instead of running them, so the work happens in the
+``run_jobs`` worker and not in the request. With ``JOBS_SYNC`` setting
+enabled ``delay`` runs the function right away, which is handy in tests
+and development.
+"""
+import json
+import logging
+import uuid
+from datetime import timedelta
+from functools import wraps
+from importlib import import_module
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def task(func):
+    """Let function be delayed with ``func.delay(*args, **kwargs)``, arguments have to be JSON serializable."""
+    name = '{}.{}'.format(func.__module__, func.__name__)
+
+    @wraps(func)
+    def delay(*args, **kwargs):
+        if settings.JOBS_SYNC:
+            return func(*args, **kwargs)
+        from .models import Job
+        return Job.objects.create(name=name, payload=json.dumps({'args': args, 'kwargs': kwargs}))
+
+    func.delay = delay
+    return func
+
+
+def resolve(name):
+    """Return task function by its dotted name."""
+    module, func = name.rsplit('.', 1)
+    return getattr(import_module(module), func)
+
+
+def claim(batch_size):
+    """Mark a batch of due jobs as taken by this worker and return them.
+
+    Jobs are taken with a conditional UPDATE, so concurrent workers never
+    get the same job. Jobs left running by crashed workers are given back,
+    counting the crash as a failed attempt, so a job killing its worker
+    every time gives up like any other failing job.
+    """
+    from .models import Job
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, claimed_at__lt=now - timedelta(seconds=settings.JOBS_TIMEOUT))
+    timed_out = {'attempts': F('attempts') + 1, 'claimed_by': '', 'last_error': 'Worker did not finish the job.'}
+    stale.filter(attempts__gte=settings.JOBS_MAX_ATTEMPTS - 1).update(status=Job.FAILED, **timed_out)
+    stale.update(status=Job.PENDING, **timed_out)
+    due = Job.objects.filter(status=Job.PENDING, run_after__lte=now).order_by('run_after', 'pk')
+    ids = list(due.values_list('pk', flat=True)[:batch_size])
+    token = uuid.uuid4().hex
+    Job.objects.filter(pk__in=ids, status=Job.PENDING).update(status=Job.RUNNING, claimed_by=token, claimed_at=now)
+    return list(Job.objects.filter(claimed_by=token, status=Job.RUNNING).order_by('run_after', 'pk'))
+
+
+def run(jobs):
+    """Run claimed jobs, executing identical ones only once, and return amount of failures."""
+    done = {}
+    failures = 0
+    for job in jobs:
+        key = (job.name, job.payload)
+        if key not in done:
+            done[key] = _execute(job)
+        if done[key] is None:
+            job.delete()
+        else:
+            failures += 1
+            _retry(job, done[key])
+    return failures
+
+
+def _execute(job):
+    """Run the job and return text of the error it failed with, if any."""
+    try:
+        payload = json.loads(job.payload)
+        with transaction.atomic():
+            resolve(job.name)(*payload['args'], **payload['kwargs'])
+    except Exception as error:
+        logger.exception('Job %s %s failed', job.pk, job.name)
+        return '{}: {}'.format(type(error).__name__, error)
+
+
+def _retry(job, error):
+    """Schedule failed job again with exponential backoff or give up on it."""
+    from .models import Job
+    job.attempts += 1
+    job.last_error = error
+    job.claimed_by = ''
+    if job.attempts >= settings.JOBS_MAX_ATTEMPTS:
+        job.status = Job.FAILED
+    else:
+        job.status = Job.PENDING
+        job.run_after = timezone.now() + timedelta(seconds=settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1))
+    job.save()
@@ -0,0 +1 @@
+"""Commands available through manage.py."""
@@ -0,0 +1,61 @@
+"""Command measuring what opening database connections costs every request."""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+
+from blog.backends import ConnectionReuseMixin
+
+# Name, CONN_MAX_AGE, HEALTH_CHECKS and POOL_SIZE of compared setups
+MODES = [
+    ('new connection', 0, False, 0),
+    ('persistent', None, False, 0),
+    ('persistent, health check', None, True, 0),
+    ('pool', 60, False, 4),
+]
+
+
+class Command(BaseCommand):
+    """Run one trivial query per simulated request with every connection setup."""
+
+    help = 'Benchmark per-request database connection overhead.'
+
+    def add_arguments(self, parser):
+        """Describe command line options."""
+        parser.add_argument('--requests', type=int, default=1000, help='Requests simulated with every setup.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database to connect to.')
+
+    def handle(self, *args, **options):
+        """Report mean and 99th percentile of request time for every setup."""
+        connection = connections[options['database']]
+        original = dict(connection.settings_dict)
+        try:
+            for name, max_age, health_checks, pool_size in MODES:
+                if (health_checks or pool_size) and not isinstance(connection, ConnectionReuseMixin):
+                    self.stdout.write('{:<26} not supported by {}'.format(name, original['ENGINE']))
+                    continue
+                connection.close()
+                connection.settings_dict.update(CONN_MAX_AGE=max_age, HEALTH_CHECKS=health_checks,
+                                                POOL_SIZE=pool_size)
+                timings = sorted(self.measure(connection, options['requests']))
+                self.stdout.write('{:<26} mean {:8.1f} us, p99 {:8.1f} us'.format(
+                    name, sum(timings) / len(timings), timings[min(len(timings) - 1, int(len(timings) * 0.99))]))
+                connection.close()
+                if pool_size:
+                    connection.pool.clear()
+        finally:
+            connection.settings_dict.clear()
+            connection.settings_dict.update(original)
+
+    def measure(self, connection, requests):
+        """Return microseconds spent by every request, closing connections at its ends as Django does."""
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            close_old_connections()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            close_old_connections()
+            timings.append((time.perf_counter() - started) * 1000000)
+        return timings
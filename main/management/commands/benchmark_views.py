@@ -0,0 +1,37 @@
+"""Command for benchmarking main views against checked-in budgets."""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+
+from main import benchmark
+
+
+class Command(BaseCommand):
+    """Seed a throwaway test database at several sizes and measure every view on it."""
+
+    help = 'Benchmark main views and fail if any of them is over budget.'
+
+    def add_arguments(self, parser):
+        """Describe command line options."""
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10000, 100000],
+                            help='Amounts of posts to measure views with.')
+        parser.add_argument('--requests', type=int, default=20, help='Requests made to each view per size.')
+        parser.add_argument('--budgets', default=benchmark.BUDGETS_PATH, help='JSON file with budgets of views.')
+        parser.add_argument('--output', help='File to store measured results in as JSON.')
+
+    def handle(self, *args, **options):
+        """Run benchmark in test database, so real data is never touched."""
+        runner = DiscoverRunner(verbosity=0)
+        old_config = runner.setup_databases()
+        try:
+            results = benchmark.run(options['sizes'], options['requests'], report=self.stdout.write)
+        finally:
+            runner.teardown_databases(old_config)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+        failures = benchmark.over_budget(results, benchmark.load_budgets(options['budgets']))
+        if failures:
+            raise CommandError('Over budget:\n' + '\n'.join(failures))
+        self.stdout.write('All views are within budget.')
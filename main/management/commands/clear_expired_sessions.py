@@ -0,0 +1,41 @@
+"""Command deleting expired sessions in batches."""
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DatabaseStore
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    """Delete expired sessions from DB a batch per statement, unlike ``clearsessions`` deleting them at once.
+
+    One huge DELETE would lock the table and bloat the transaction log for
+    as long as it runs, batches let requests write their sessions in between.
+    """
+
+    help = 'Delete expired sessions in batches.'
+
+    def add_arguments(self, parser):
+        """Describe command line options."""
+        parser.add_argument('--batch-size', type=int, default=1000, help='Amount of sessions deleted per query.')
+        parser.add_argument('--sleep', type=float, default=0.0, help='Seconds to wait between batches.')
+
+    def handle(self, *args, **options):
+        """Delete the oldest expired sessions until none is left."""
+        if not issubclass(import_module(settings.SESSION_ENGINE).SessionStore, DatabaseStore):
+            self.stdout.write('Sessions are not stored in the database.')
+            return
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now).order_by('expire_date')
+        deleted = 0
+        while True:
+            keys = list(expired.values_list('pk', flat=True)[:options['batch_size']])
+            if not keys:
+                break
+            deleted += Session.objects.filter(pk__in=keys).delete()[0]
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write('Deleted {} expired session(s).'.format(deleted))
@@ -0,0 +1,70 @@
+"""Command for streaming posts and comments out as JSON Lines."""
+import json
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from main.models import Comment, Post
+
+# Keys of exported objects and lookups their values are taken from
+POST_COLUMNS = (('id', 'pk'), ('author', 'author__username'), ('title', 'title'), ('text', 'text'),
+                ('created_date', 'created_date'), ('published_date', 'published_date'))
+COMMENT_COLUMNS = (('id', 'pk'), ('post', 'post'), ('author', 'author'), ('text', 'text'),
+                   ('created_date', 'created_date'), ('is_approved', 'is_approved'))
+
+
+def _line(model, columns, values):
+    """Turn ``values_list`` row into a JSON line keeping full precision of dates."""
+    row = {'model': model}
+    for (key, _), value in zip(columns, values):
+        row[key] = value.isoformat() if isinstance(value, datetime) else value
+    return json.dumps(row) + '\n'
+
+
+def _chunks(queryset, lookups, size):
+    """Yield ``values_list`` rows of the queryset in pk order, fetching ``size`` rows per query.
+
+    Every chunk starts after the last pk seen, so no query reads more than
+    ``size`` rows whatever the database driver buffers.
+    """
+    last = None
+    while True:
+        chunk = queryset.order_by('pk')
+        if last is not None:
+            chunk = chunk.filter(pk__gt=last)
+        rows = list(chunk.values_list(*lookups)[:size])
+        yield from rows
+        if len(rows) < size:
+            return
+        last = rows[-1][0]
+
+
+class Command(BaseCommand):
+    """Write every post followed by every comment, one JSON object per line."""
+
+    help = 'Export posts and comments as JSON Lines.'
+
+    def add_arguments(self, parser):
+        """Describe command line options."""
+        parser.add_argument('--output', '-o', help='File to write to, standard output by default.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Amount of rows fetched per query.')
+
+    def handle(self, *args, **options):
+        """Stream rows in pk chunks so memory use does not grow with the table."""
+        output = open(options['output'], 'w') if options['output'] else self.stdout
+        started = time.time()
+        exported = 0
+        try:
+            for model, queryset, columns in [('post', Post.objects.all(), POST_COLUMNS),
+                                             ('comment', Comment.objects.all(), COMMENT_COLUMNS)]:
+                lookups = [lookup for _, lookup in columns]
+                for values in _chunks(queryset, lookups, options['chunk_size']):
+                    output.write(_line(model, columns, values))
+                    exported += 1
+        finally:
+            if output is not self.stdout:
+                output.close()
+        elapsed = time.time() - started
+        self.stderr.write('Exported {} row(s) in {:.1f}s, {:.0f} rows/s.'.format(
+            exported, elapsed, exported / elapsed if elapsed else 0))
@@ -0,0 +1,124 @@
+"""Command for loading posts and comments from JSON Lines in bulk."""
+import json
+import sys
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from main import search
+from main.cache import LIST_VERSION, bump, post_version
+from main.models import Comment, Post
+
+
+class Command(BaseCommand):
+    """Insert rows written by ``export_blog`` with ``bulk_create``, keeping their ids.
+
+    Bulk inserts bypass ``save``, so derived data is restored afterwards:
+    rendered texts and excerpts are computed on the fly, comment counters
+    and search index are updated for the imported posts at the end, and
+    so are change dates and cached pages of posts which got comments.
+    """
+
+    help = 'Import posts and comments from JSON Lines produced by export_blog.'
+
+    def add_arguments(self, parser):
+        """Describe command line options."""
+        parser.add_argument('input', nargs='?', help='File to read from, standard input by default.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Amount of rows inserted per transaction.')
+
+    def handle(self, *args, **options):
+        """Read lines one by one and flush them to DB in batches."""
+        self.batch_size = options['batch_size']
+        self.authors = {}
+        self.posts, self.comments = [], []
+        self.touched, self.commented = set(), set()
+        self.imported = 0
+        self.started = time.time()
+        source = open(options['input']) if options['input'] else sys.stdin
+        try:
+            for number, line in enumerate(source, 1):
+                if not line.strip():
+                    continue
+                try:
+                    self.add(json.loads(line))
+                except (ValueError, KeyError) as error:
+                    raise CommandError('Line {}: {}'.format(number, error))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        self.flush()
+        self.finish()
+
+    def add(self, row):
+        """Turn row into unsaved model instance and flush the batch when it is full."""
+        if row['model'] == 'post':
+            post = Post(id=row['id'], author_id=self.author(row['author']), title=row['title'], text=row['text'],
+                        created_date=parse_datetime(row['created_date']),
+                        published_date=row['published_date'] and parse_datetime(row['published_date']))
+            post.text_html, post.excerpt = post.render_text(), post.make_excerpt()
+            if post.published_date is not None and post.published_date <= timezone.now():
+                post.announced_at = post.published_date
+            self.posts.append(post)
+        elif row['model'] == 'comment':
+            self.comments.append(Comment(id=row['id'], post_id=row['post'], author=row['author'], text=row['text'],
+                                         created_date=parse_datetime(row['created_date']),
+                                         is_approved=row['is_approved']))
+        else:
+            raise ValueError('unknown model {!r}'.format(row['model']))
+        if len(self.posts) + len(self.comments) >= self.batch_size:
+            self.flush()
+
+    def author(self, username):
+        """Return id of the user with given username, looking every name up once."""
+        if username not in self.authors:
+            try:
+                self.authors[username] = User.objects.values_list('pk', flat=True).get(username=username)
+            except User.DoesNotExist:
+                raise CommandError('User {!r} does not exist.'.format(username))
+        return self.authors[username]
+
+    def flush(self):
+        """Insert collected rows in one transaction."""
+        try:
+            with transaction.atomic():
+                Post.objects.bulk_create(self.posts, batch_size=self.batch_size)
+                Comment.objects.bulk_create(self.comments, batch_size=self.batch_size)
+        except IntegrityError as error:
+            raise CommandError('Rows after {} imported ones conflict with existing data, '
+                               'were they imported already? {}'.format(self.imported, error))
+        self.touched.update(post.pk for post in self.posts)
+        self.commented.update(comment.post_id for comment in self.comments)
+        self.touched.update(self.commented)
+        self.imported += len(self.posts) + len(self.comments)
+        self.posts, self.comments = [], []
+        self.report('Imported')
+
+    def finish(self):
+        """Restore data which ``save`` would have maintained."""
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Post, Comment]):
+                cursor.execute(sql)
+        now = timezone.now()
+        touched = sorted(self.touched)
+        for start in range(0, len(touched), self.batch_size):
+            batch = touched[start:start + self.batch_size]
+            with transaction.atomic():
+                Post.objects.filter(pk__in=batch).rebuild_comment_counts(batch_size=self.batch_size)
+                Post.objects.filter(pk__in=self.commented.intersection(batch)).update(comments_updated_at=now)
+                for pk in batch:
+                    search.update_post(pk)
+            # Pages of existing posts which got comments are invalidated too
+            bump(*[post_version(pk) for pk in batch])
+        bump(LIST_VERSION, pin_primary=True)
+        self.report('Done')
+
+    def report(self, status):
+        """Print progress with import speed."""
+        elapsed = time.time() - self.started
+        self.stdout.write('{}: {} row(s) in {:.1f}s, {:.0f} rows/s.'.format(
+            status, self.imported, elapsed, self.imported / elapsed if elapsed else 0))
@@ -0,0 +1,58 @@
+"""Command profiling import time and memory of the web application."""
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """Load ``blog.wsgi`` in a fresh interpreter and report where its startup time and memory go.
+
+    Modules are already imported in the process running the command, so
+    measuring happens in a child process, see ``main.startup``.
+    """
+
+    help = 'Report import time per app and module and memory of the warmed up application.'
+
+    def add_arguments(self, parser):
+        """Describe command line options."""
+        parser.add_argument('urls', nargs='*', default=['/'], help='URLs requested to warm the application up.')
+        parser.add_argument('--requests', type=int, default=20, help='Requests made to each URL.')
+        parser.add_argument('--top', type=int, default=20, help='Amount of slowest apps and modules listed.')
+
+    def handle(self, *args, **options):
+        """Run the child process and print its measurements."""
+        environ = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        child = subprocess.run([sys.executable, '-m', 'main.startup', str(options['requests'])] + options['urls'],
+                               cwd=str(settings.BASE_DIR), env=environ, stdout=subprocess.PIPE)
+        if child.returncode:
+            raise CommandError('Profiled process failed with exit code {}.'.format(child.returncode))
+        result = json.loads(child.stdout.decode())
+        self.stdout.write('Imported {} module(s) in {:.1f} ms.'.format(len(result['modules']),
+                                                                       result['import_seconds'] * 1000))
+        self.stdout.write('\nSelf time by app or package:')
+        slowest = sorted(self.by_app(result['modules']).items(), key=lambda item: -item[1])[:options['top']]
+        for name, seconds in slowest:
+            self.stdout.write('{:>10.1f} ms  {}'.format(seconds * 1000, name))
+        self.stdout.write('\nSlowest modules, cumulative and self time:')
+        slowest = sorted(result['modules'].items(), key=lambda item: -item[1][0])[:options['top']]
+        for name, (cumulative, own) in slowest:
+            self.stdout.write('{:>10.1f} ms {:>10.1f} ms  {}'.format(cumulative * 1000, own * 1000, name))
+        self.stdout.write('\nWarm-up responses:')
+        for url, status in result['statuses'].items():
+            self.stdout.write('{:>10}  {}'.format(status, url))
+        self.stdout.write('\nResident memory: {:.1f} MiB at start, {:.1f} MiB loaded, {:.1f} MiB warm.'.format(
+            result['rss_before'] / 1024, result['rss_loaded'] / 1024, result['rss_warm'] / 1024))
+
+    def by_app(self, modules):
+        """Sum self time of modules per installed app, or per top level package outside of apps."""
+        totals = defaultdict(float)
+        for name, (_, own) in modules.items():
+            app = apps.get_containing_app_config(name)
+            totals[app.label if app else name.split('.')[0]] += own
+        return totals
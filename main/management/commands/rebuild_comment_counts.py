@@ -0,0 +1,19 @@
+"""Command for recalculating denormalized comment counters."""
+from django.core.management.base import BaseCommand
+
+from main.models import Post
+
+
+class Command(BaseCommand):
+    """Bring ``Post.comment_count`` and ``Post.approved_comment_count`` in sync with comments."""
+
+    help = 'Recalculate comment counters of all posts.'
+
+    def add_arguments(self, parser):
+        """Describe command line options."""
+        parser.add_argument('--batch-size', type=int, default=1000, help='Amount of posts checked per query.')
+
+    def handle(self, *args, **options):
+        """Check every post and fix counters that drifted."""
+        fixed = Post.objects.all().rebuild_comment_counts(batch_size=options['batch_size'])
+        self.stdout.write('Fixed comment counters of {} post(s).'.format(fixed))
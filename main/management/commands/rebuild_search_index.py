@@ -0,0 +1,20 @@
+"""Command for rebuilding full-text search index."""
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from main import search
+
+
+class Command(BaseCommand):
+    """Recreate search documents of all published posts."""
+
+    help = 'Rebuild full-text search index of published posts.'
+
+    def add_arguments(self, parser):
+        """Describe command line options."""
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database to rebuild index in.')
+
+    def handle(self, *args, **options):
+        """Drop the index and fill it again."""
+        indexed = search.rebuild(using=options['database'])
+        self.stdout.write('Indexed {} post(s).'.format(indexed))
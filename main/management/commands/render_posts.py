@@ -0,0 +1,24 @@
+"""Command for rendering stored HTML and excerpts of posts."""
+from django.core.management.base import BaseCommand
+
+from main.cache import bump_post
+from main.models import Post
+
+
+class Command(BaseCommand):
+    """Fill ``Post.text_html`` and ``Post.excerpt`` of posts saved before they existed or rendered differently."""
+
+    help = 'Render and store HTML and excerpts of post texts.'
+
+    def handle(self, *args, **options):
+        """Render every post and store results that differ from the current ones."""
+        rendered = 0
+        posts = Post.objects.only('pk', 'text', 'text_html', 'excerpt').order_by('pk')
+        for post in posts.iterator():
+            html, excerpt = post.render_text(), post.make_excerpt()
+            if (html, excerpt) != (post.text_html, post.excerpt):
+                # Update directly so the post does not look modified to readers
+                Post.objects.filter(pk=post.pk).update(text_html=html, excerpt=excerpt)
+                bump_post(post.pk)
+                rendered += 1
+        self.stdout.write('Rendered {} post(s).'.format(rendered))
@@ -0,0 +1,32 @@
+"""Command running background jobs worker."""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from main import jobs
+
+
+class Command(BaseCommand):
+    """Take due jobs from DB in batches and run them until stopped."""
+
+    help = 'Run background jobs worker.'
+
+    def add_arguments(self, parser):
+        """Describe command line options."""
+        parser.add_argument('--batch-size', type=int, default=100, help='Amount of jobs taken at once.')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when there are no due jobs.')
+        parser.add_argument('--once', action='store_true', help='Stop when there are no due jobs left.')
+
+    def handle(self, *args, **options):
+        """Claim and run batches, sleeping while the queue is empty."""
+        while True:
+            close_old_connections()
+            batch = jobs.claim(options['batch_size'])
+            if batch:
+                failures = jobs.run(batch)
+                self.stdout.write('Ran {} job(s), {} failed.'.format(len(batch), failures))
+            elif options['once']:
+                return
+            else:
+                time.sleep(options['sleep'])
@@ -0,0 +1,43 @@
+"""Command publishing scheduled posts when their time comes."""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from main.cache import bump_post
+from main.models import Post
+from main.signals import post_published
+
+
+class Command(BaseCommand):
+    """Announce published posts which were not announced yet, using index on announcing date.
+
+    Announcements are recorded in the database, so posts which became due
+    while the scheduler was stopped are announced once it starts, and every
+    post only once however many schedulers run. Cached pages are invalidated
+    through the cache shared with web workers, see ``CACHE_URL`` setting.
+    """
+
+    help = 'Announce scheduled posts once they are published.'
+
+    def add_arguments(self, parser):
+        """Describe command line options."""
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between checks.')
+        parser.add_argument('--once', action='store_true', help='Check once and stop.')
+
+    def handle(self, *args, **options):
+        """Invalidate cached pages of due posts and send ``post_published`` for them."""
+        while True:
+            close_old_connections()
+            for post in Post.objects.unannounced().defer('text', 'text_html'):
+                with transaction.atomic():
+                    # Another scheduler or saving the post may have announced it meanwhile
+                    if not Post.objects.filter(pk=post.pk, announced_at=None).update(announced_at=timezone.now()):
+                        continue
+                    bump_post(post.pk)
+                    post_published.send(sender=Post, post=post)
+                self.stdout.write('Published {}: {}'.format(post.pk, post.title))
+            if options['once']:
+                return
+            time.sleep(options['interval'])
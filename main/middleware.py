@@ -0,0 +1,128 @@
+"""Middleware of the project."""
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+
+from . import routers
+from .cache import recently_changed
+
+logger = logging.getLogger(__name__)
+
+_LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\?(?:, \?)*\)'), '(...)'),
+]
+
+
+def query_shape(sql):
+    """Strip literals from SQL so queries differing only in parameters look the same."""
+    for pattern, replacement in _LITERALS:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+def repeated_shapes(queries, threshold):
+    """Return ``{shape: count}`` of query shapes run at least ``threshold`` times, a sign of N+1."""
+    shapes = Counter(query_shape(query['sql']) for query in queries)
+    return {shape: count for shape, count in shapes.items() if count >= threshold}
+
+
+class RequestProfilingMiddleware:
+    """Measure SQL and template rendering of a sample of requests.
+
+    Results are sent back in ``Server-Timing`` header and logged as one
+    JSON line per request, with a warning for repeated query shapes.
+    Unsampled requests only pay for one random number.
+    """
+
+    def process_request(self, request):
+        """Start measuring if the request got into the sample."""
+        if random.random() >= settings.REQUEST_PROFILING_SAMPLE_RATE:
+            return
+        request._profiling = {'started': time.perf_counter(), 'template': 0.0, 'connections': {}}
+        for connection in connections.all():
+            request._profiling['connections'][connection.alias] = (connection.force_debug_cursor,
+                                                                   len(connection.queries_log))
+            connection.force_debug_cursor = True
+
+    def process_template_response(self, request, response):
+        """Measure time spent rendering the template once it is rendered."""
+        profiling = getattr(request, '_profiling', None)
+        if profiling is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                profiling['template'] += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def process_response(self, request, response):
+        """Collect executed queries, add ``Server-Timing`` header and log results."""
+        profiling = getattr(request, '_profiling', None)
+        if profiling is None:
+            return response
+        queries = []
+        for connection in connections.all():
+            force_debug_cursor, first = profiling['connections'].get(connection.alias, (False, 0))
+            connection.force_debug_cursor = force_debug_cursor
+            queries.extend(list(connection.queries_log)[first:])
+        total_ms = (time.perf_counter() - profiling['started']) * 1000
+        db_ms = sum(float(query['time']) for query in queries) * 1000
+        template_ms = profiling['template'] * 1000
+        repeated = repeated_shapes(queries, settings.REQUEST_PROFILING_REPEAT_THRESHOLD)
+        response['Server-Timing'] = 'db;dur={:.2f};desc="{} queries", tpl;dur={:.2f}, total;dur={:.2f}'.format(
+            db_ms, len(queries), template_ms, total_ms)
+        slowest = sorted(queries, key=lambda query: float(query['time']), reverse=True)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+            'db_ms': round(db_ms, 2),
+            'template_ms': round(template_ms, 2),
+            'queries': len(queries),
+            'slowest': [{'sql': query['sql'], 'ms': float(query['time']) * 1000}
+                        for query in slowest[:settings.REQUEST_PROFILING_SLOWEST]],
+        }))
+        for shape, count in repeated.items():
+            logger.warning(json.dumps({'path': request.path, 'repeated_query': shape, 'count': count}))
+        return response
+
+
+class ReplicaMiddleware:
+    """Let anonymous GETs of views with ``replica_reads`` set read from replicas.
+
+    Clients whose request wrote to the database get a cookie which keeps
+    them on the primary for ``REPLICA_STICKY_SECONDS``, and everybody stays
+    there as long after a post changed, so pages and ETags of its new
+    versions are not computed from stale replicas. Place it after
+    ``AuthenticationMiddleware``.
+    """
+
+    def process_request(self, request):
+        """Start every request on the primary."""
+        routers.reset()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Switch to replicas if the view and the client allow it."""
+        view = getattr(view_func, 'view_class', view_func)
+        if (getattr(view, 'replica_reads', False) and request.method in ('GET', 'HEAD') and
+                not request.user.is_authenticated() and settings.REPLICA_STICKY_COOKIE not in request.COOKIES and
+                not recently_changed()):
+            routers.read_from_replica(True)
+
+    def process_response(self, request, response):
+        """Keep client which has written something on the primary for a while."""
+        if routers.wrote():
+            response.set_cookie(settings.REPLICA_STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS,
+                                httponly=True)
+        routers.reset()
+        return response
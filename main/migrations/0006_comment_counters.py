@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.12 on 2026-10-18 07:06
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import Case, Count, IntegerField, Sum, When
+
+
+def count_comments(apps, schema_editor):
+    """Fill in comment counters for posts that already have comments."""
+    Post = apps.get_model('main', 'Post')
+    Comment = apps.get_model('main', 'Comment')
+    counts = Comment.objects.values('post').annotate(
+        total=Count('pk'),
+        approved=Sum(Case(When(is_approved=True, then=1), default=0, output_field=IntegerField())),
+    )
+    for row in counts.iterator():
+        Post.objects.filter(pk=row['post']).update(comment_count=row['total'], approved_comment_count=row['approved'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_auto_20170117_2054'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='approved_comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
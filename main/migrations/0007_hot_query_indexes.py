@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.12 on 2026-10-18 07:07
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+from main.migrations._drafts_index import create_drafts_index, drop_drafts_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_comment_counters'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='comment',
+            index_together=set([('post', 'is_approved', 'created_date')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='post',
+            index_together=set([('published_date', 'id')]),
+        ),
+        migrations.RunPython(create_drafts_index, drop_drafts_index),
+    ]
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.12 on 2026-10-18 07:20
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+from main.migrations._drafts_index import restore_drafts_index
+
+
+def fill_change_dates(apps, schema_editor):
+    """Treat existing posts as modified when they were created or published."""
+    Post = apps.get_model('main', 'Post')
+    Comment = apps.get_model('main', 'Comment')
+    Post.objects.update(updated_at=F('created_date'))
+    Post.objects.filter(published_date__gt=F('created_date')).update(updated_at=F('published_date'))
+    newest = Comment.objects.values('post').annotate(newest=models.Max('created_date'))
+    for row in newest.iterator():
+        Post.objects.filter(pk=row['post']).update(comments_updated_at=row['newest'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_hot_query_indexes'),
+    ]
+
+    operations = [
+        restore_drafts_index,
+        migrations.AddField(
+            model_name='post',
+            name='comments_updated_at',
+            field=models.DateTimeField(db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_change_dates, migrations.RunPython.noop),
+        restore_drafts_index,
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.12 on 2026-10-18 07:40
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.template.defaultfilters import linebreaksbr
+
+from main.migrations._drafts_index import restore_drafts_index
+
+
+def render_texts(apps, schema_editor):
+    """Render HTML of existing posts the same way ``Post.render_text`` does."""
+    Post = apps.get_model('main', 'Post')
+    for pk, text in Post.objects.values_list('pk', 'text').iterator():
+        Post.objects.filter(pk=pk).update(text_html=linebreaksbr(text, autoescape=True))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_post_change_tracking'),
+    ]
+
+    operations = [
+        restore_drafts_index,
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(render_texts, migrations.RunPython.noop),
+        restore_drafts_index,
+    ]
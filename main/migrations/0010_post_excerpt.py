@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.12 on 2026-10-18 07:50
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+from main.migrations._drafts_index import restore_drafts_index
+
+
+def make_excerpts(apps, schema_editor):
+    """Cut excerpts of existing posts the same way ``Post.make_excerpt`` does."""
+    Post = apps.get_model('main', 'Post')
+    for pk, text in Post.objects.values_list('pk', 'text').iterator():
+        Post.objects.filter(pk=pk).update(excerpt=Truncator(text).chars(200))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_post_text_html'),
+    ]
+
+    operations = [
+        restore_drafts_index,
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(make_excerpts, migrations.RunPython.noop),
+        restore_drafts_index,
+    ]
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.12 on 2026-10-18 08:00
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations
+
+
+def _has_fts5(cursor):
+    """Tell if SQLite was built with FTS5."""
+    cursor.execute('PRAGMA compile_options')
+    return 'ENABLE_FTS5' in [row[0] for row in cursor.fetchall()]
+
+
+def create_search_index(apps, schema_editor):
+    """Create full-text index storage and fill it with published posts."""
+    Post = apps.get_model('main', 'Post')
+    Comment = apps.get_model('main', 'Comment')
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'postgresql':
+            cursor.execute('CREATE TABLE main_post_search (post_id integer PRIMARY KEY REFERENCES main_post (id) '
+                           'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, document tsvector NOT NULL)')
+            cursor.execute('CREATE INDEX main_post_search_document ON main_post_search USING GIN (document)')
+            sql = ('INSERT INTO main_post_search (post_id, document) VALUES '
+                   '(%s, setweight(to_tsvector(%s::regconfig, %s), \'A\') || '
+                   'setweight(to_tsvector(%s::regconfig, %s), \'B\'))')
+        elif vendor == 'sqlite' and _has_fts5(cursor):
+            cursor.execute("CREATE VIRTUAL TABLE main_post_search USING fts5(title, body, "
+                           "tokenize='porter unicode61')")
+            sql = 'INSERT INTO main_post_search (rowid, title, body) VALUES (%s, %s, %s)'
+        else:
+            return
+        for pk, title, text in Post.objects.filter(published_date__isnull=False).values_list(
+                'pk', 'title', 'text').iterator():
+            comments = Comment.objects.filter(post=pk, is_approved=True).values_list('text', flat=True)
+            body = '\n'.join([text] + list(comments))
+            if vendor == 'postgresql':
+                cursor.execute(sql, [pk, settings.SEARCH_CONFIG, title, settings.SEARCH_CONFIG, body])
+            else:
+                cursor.execute(sql, [pk, title, body])
+
+
+def drop_search_index(apps, schema_editor):
+    """Remove full-text index storage."""
+    with schema_editor.connection.cursor() as cursor:
+        if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+            cursor.execute('DROP TABLE IF EXISTS main_post_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.12 on 2026-10-18 07:37
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+from main.migrations._drafts_index import create_drafts_index, drop_drafts_index_if_exists
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_job'),
+    ]
+
+    operations = [
+        # Hand-made partial index is replaced by one Django keeps through table rebuilds
+        migrations.RunPython(drop_drafts_index_if_exists, create_drafts_index),
+        migrations.AlterIndexTogether(
+            name='post',
+            index_together=set([('published_date', 'created_date', 'id'), ('published_date', 'id')]),
+        ),
+    ]
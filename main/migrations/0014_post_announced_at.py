@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.12 on 2026-10-18 07:46
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def mark_announced(apps, schema_editor):
+    """Treat posts which are already visible as announced when they were published."""
+    Post = apps.get_model('main', 'Post')
+    Post.objects.filter(published_date__lte=timezone.now()).update(announced_at=F('published_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_drafts_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='announced_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(mark_announced, migrations.RunPython.noop),
+        migrations.AlterIndexTogether(
+            name='post',
+            index_together=set([('published_date', 'created_date', 'id'), ('published_date', 'id'), ('announced_at', 'published_date')]),
+        ),
+    ]
@@ -0,0 +1,46 @@
+"""Partial index over drafts shared by migrations.
+
+Django does not know about this index, and SQLite schema editor rebuilds
+the whole table on most ``main_post`` alterations, dropping it. Migrations
+0008 to 0010 start and end with ``restore_drafts_index``, so the index
+survives both directions. Migration 0013 replaces it with an index Django
+manages itself, and later migrations need none of this.
+"""
+from django.db import migrations
+
+DRAFTS_INDEX = 'main_post_drafts_created_date'
+
+
+def create_drafts_index(apps, schema_editor):
+    """Index drafts by creation date, partially where the backend allows it."""
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute('CREATE INDEX {} ON main_post (created_date) '
+                              'WHERE published_date IS NULL'.format(DRAFTS_INDEX))
+    else:
+        schema_editor.execute('CREATE INDEX {} ON main_post (published_date, created_date)'.format(DRAFTS_INDEX))
+
+
+def drop_drafts_index(apps, schema_editor):
+    """Remove index created by ``create_drafts_index``."""
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('DROP INDEX {} ON main_post'.format(DRAFTS_INDEX))
+    else:
+        schema_editor.execute('DROP INDEX {}'.format(DRAFTS_INDEX))
+
+
+def drop_drafts_index_if_exists(apps, schema_editor):
+    """Remove the index, which SQLite could have already dropped."""
+    if schema_editor.connection.vendor == 'mysql':
+        drop_drafts_index(apps, schema_editor)
+    else:
+        schema_editor.execute('DROP INDEX IF EXISTS {}'.format(DRAFTS_INDEX))
+
+
+def _recreate_on_sqlite(apps, schema_editor):
+    """Create the index again if SQLite dropped it together with the old table."""
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('CREATE INDEX IF NOT EXISTS {} ON main_post (created_date) '
+                              'WHERE published_date IS NULL'.format(DRAFTS_INDEX))
+
+
+restore_drafts_index = migrations.RunPython(_recreate_on_sqlite, _recreate_on_sqlite)
@@ -1,6 +1,67 @@
 """Models for your project are located here."""
-from django.db import models
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, When
+from django.template.defaultfilters import linebreaksbr
 from django.utils import timezone
+from django.utils.text import Truncator
+
+from . import search
+from .cache import bump_post
+from .signals import post_published
+
+EXCERPT_LENGTH = 200
+# Most ids put into one ``WHERE id IN (...)`` by bulk moderation, below SQLite's limit of query parameters
+MODERATION_BATCH_SIZE = 500
+
+
+class PostQuerySet(models.QuerySet):
+    """Reusable filters for posts."""
+
+    def published(self):
+        """Return posts that are already visible for readers."""
+        return self.filter(published_date__lte=timezone.now())
+
+    def unannounced(self):
+        """Return published posts for which ``post_published`` was not sent yet, oldest first."""
+        return self.published().filter(announced_at=None).order_by('published_date', 'pk')
+
+    def listed(self):
+        """Return published posts without full texts, as lists and feeds show only excerpts."""
+        return self.published().defer('text', 'text_html')
+
+    def rebuild_comment_counts(self, batch_size=1000):
+        """Recalculate denormalized comment counters of posts in the queryset.
+
+        Return amount of posts whose counters were out of sync.
+        """
+        fixed = 0
+        posts = self.order_by('pk').values_list('pk', 'comment_count', 'approved_comment_count')
+        batch = []
+        for row in posts.iterator():
+            batch.append(row)
+            if len(batch) == batch_size:
+                fixed += self._fix_comment_counts(batch)
+                batch = []
+        if batch:
+            fixed += self._fix_comment_counts(batch)
+        return fixed
+
+    def _fix_comment_counts(self, batch):
+        """Update counters of ``(pk, comment_count, approved_comment_count)`` rows that differ from real ones."""
+        real = Comment.objects.filter(post__in=[pk for pk, _, _ in batch]).values('post').annotate(
+            total=Count('pk'),
+            approved=Sum(Case(When(is_approved=True, then=1), default=0, output_field=IntegerField())),
+        )
+        real = {row['post']: (row['total'], row['approved']) for row in real}
+        fixed = 0
+        for pk, total, approved in batch:
+            counts = real.get(pk, (0, 0))
+            if counts != (total, approved):
+                Post.objects.filter(pk=pk).update(comment_count=counts[0], approved_comment_count=counts[1])
+                fixed += 1
+        return fixed
 
 
 class Post(models.Model):
@@ -9,13 +70,86 @@ class Post(models.Model):
     author = models.ForeignKey('auth.User')
     title = models.CharField(max_length=200)
     text = models.TextField()
+    text_html = models.TextField(editable=False, default='')
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, editable=False, default='')
     created_date = models.DateTimeField(default=timezone.now)
     published_date = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    comments_updated_at = models.DateTimeField(null=True, editable=False, db_index=True)
+    announced_at = models.DateTimeField(null=True, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    approved_comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        # Published posts are listed by the first index, drafts (published_date IS NULL) by the second,
+        # scheduled posts which became due are found by the third
+        index_together = [('published_date', 'id'), ('published_date', 'created_date', 'id'),
+                          ('announced_at', 'published_date')]
 
-    def publish(self):
-        """Publishing post."""
-        self.published_date = timezone.now()
-        self.save()
+    def save(self, *args, **kwargs):
+        """Render text, save post, queue its reindexing and invalidate cached pages showing it.
+
+        ``post_published`` is sent if the post is visible and was not announced
+        yet, hidden posts are left for ``run_scheduler`` to announce.
+        """
+        now = timezone.now()
+        announce = False
+        if self.published_date is None or self.published_date > now:
+            self.announced_at = None
+        elif self.announced_at is None:
+            # Scheduler may have announced the post since it was loaded
+            announce = self._state.adding or Post.objects.filter(pk=self.pk, announced_at=None).exists()
+            self.announced_at = now
+        self.text_html = self.render_text()
+        self.excerpt = self.make_excerpt()
+        super().save(*args, **kwargs)
+        search.update_post.delay(self.pk)
+        bump_post(self.pk)
+        if announce:
+            post_published.send(sender=Post, post=self)
+
+    def delete(self, *args, **kwargs):
+        """Delete post, drop it from search index and invalidate cached pages showing it."""
+        pk = self.pk
+        result = super().delete(*args, **kwargs)
+        search.remove_post(pk)
+        bump_post(pk)
+        return result
+
+    def render_text(self):
+        """Return post text as HTML ready to be put into page as is."""
+        return linebreaksbr(self.text, autoescape=True)
+
+    def make_excerpt(self):
+        """Return beginning of text shown in lists of posts."""
+        return Truncator(self.text).chars(EXCERPT_LENGTH)
+
+    def publish(self, when=None):
+        """Publish post now or schedule it to be published at ``when``, return whether it has changed.
+
+        Only publishing columns of a post which is not visible yet are
+        written, by one conditional UPDATE, so concurrent edits of its text
+        are kept and publishing a visible post again does nothing.
+        """
+        now = timezone.now()
+        when = when or now
+        announced_at = now if when <= now else None
+        hidden = Post.objects.filter(Q(published_date=None) | Q(published_date__gt=now), pk=self.pk)
+        if not hidden.exclude(published_date=when).update(published_date=when, announced_at=announced_at,
+                                                          updated_at=now):
+            return False
+        self.published_date, self.announced_at, self.updated_at = when, announced_at, now
+        search.update_post.delay(self.pk)
+        bump_post(self.pk)
+        if announced_at is not None:
+            post_published.send(sender=Post, post=self)
+        return True
+
+    def is_scheduled(self):
+        """Check whether post waits for its publishing date."""
+        return self.published_date is not None and self.published_date > timezone.now()
 
     def __str__(self):
         """Return title of Post.
@@ -27,7 +161,64 @@ class Post(models.Model):
     @property
     def approved_comments(self):
         """Show comments that are ok in user's opinion."""
-        return self.comments.filter(approved_comment=True)
+        return self.comments.filter(is_approved=True)
+
+
+class CommentQuerySet(models.QuerySet):
+    """Reusable filters and bulk moderation of comments."""
+
+    def pending(self):
+        """Return comments waiting for moderation."""
+        return self.filter(is_approved=False)
+
+    def approve(self):
+        """Approve pending comments of the queryset in one transaction and return their amount.
+
+        Comments are updated by ``UPDATE ... WHERE id IN (...)``, and so are
+        counters of their posts, one post per statement.
+        """
+        with transaction.atomic():
+            rows = list(self.pending().select_for_update().values_list('pk', 'post'))
+            pks = [pk for pk, _ in rows]
+            for start in range(0, len(pks), MODERATION_BATCH_SIZE):
+                Comment.objects.filter(pk__in=pks[start:start + MODERATION_BATCH_SIZE]).update(is_approved=True)
+            approved = Counter(post for _, post in rows)
+            _posts_changed({post: (0, count) for post, count in approved.items()})
+        return len(rows)
+
+    def delete(self):
+        """Delete comments of the queryset in one transaction and discount them from their posts' counters."""
+        with transaction.atomic():
+            rows = list(self.select_for_update().values_list('pk', 'post', 'is_approved'))
+            pks = [pk for pk, _, _ in rows]
+            deleted, by_model = 0, Counter()
+            for start in range(0, len(pks), MODERATION_BATCH_SIZE):
+                # Plain queryset deletion, without counting comments again
+                batch = super(CommentQuerySet, Comment.objects.filter(pk__in=pks[start:start + MODERATION_BATCH_SIZE]))
+                count, counts = batch.delete()
+                deleted += count
+                by_model.update(counts)
+            changes = {}
+            for _, post, is_approved in rows:
+                total, approved = changes.get(post, (0, 0))
+                changes[post] = (total - 1, approved - int(is_approved))
+            _posts_changed(changes)
+        return deleted, dict(by_model)
+
+
+def _posts_changed(changes):
+    """Shift comment counters by ``{post_id: (total, approved)}`` and invalidate pages of the posts.
+
+    Posts are reindexed only when their visible comments changed.
+    """
+    now = timezone.now()
+    for post, (total, approved) in changes.items():
+        Post.objects.filter(pk=post).update(comment_count=F('comment_count') + total,
+                                            approved_comment_count=F('approved_comment_count') + approved,
+                                            comments_updated_at=now)
+        if approved:
+            search.update_post.delay(post)
+        bump_post(post, comments_only=True)
 
 
 class Comment(models.Model):
@@ -36,14 +227,88 @@ class Comment(models.Model):
     post = models.ForeignKey('main.Post', related_name='comments', on_delete=models.CASCADE)
     author = models.CharField(max_length=200)
     text = models.TextField()
-    created_date = models.DateTimeField(default=timezone.now)
+    created_date = models.DateTimeField(default=timezone.now, db_index=True)
     is_approved = models.BooleanField(default=False)
 
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        # Comments of a post are read by the first index, moderation queue of all posts by the second
+        index_together = [('post', 'is_approved', 'created_date'), ('is_approved', 'created_date', 'id')]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember approval state stored in DB to know how counters change on save."""
+        instance = super().from_db(db, field_names, values)
+        instance._stored_is_approved = instance.__dict__.get('is_approved', False)
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Save comment and shift its post's counters by what has changed."""
+        adding = self._state.adding
+        was_approved = getattr(self, '_stored_is_approved', False)
+        super().save(*args, **kwargs)
+        self._stored_is_approved = self.is_approved
+        self._post_changed(int(adding), int(self.is_approved) - int(was_approved),
+                           reindex=self.is_approved or was_approved)
+
+    def delete(self, *args, **kwargs):
+        """Delete comment and discount it from its post's counters."""
+        was_approved = getattr(self, '_stored_is_approved', self.is_approved)
+        result = super().delete(*args, **kwargs)
+        self._post_changed(-1, -int(was_approved), reindex=was_approved)
+        return result
+
     def approve(self):
-        """Approve comment and save it in DB."""
-        self.is_approved = True
-        self.save()
+        """Approve comment, return whether it was pending.
+
+        Only the approval flag is written, by one conditional UPDATE, so
+        approving an approved comment again does nothing.
+        """
+        approved = Comment.objects.filter(pk=self.pk, is_approved=False).update(is_approved=True)
+        self.is_approved = self._stored_is_approved = True
+        if approved:
+            self._post_changed(approved=1, reindex=True)
+        return bool(approved)
+
+    def _post_changed(self, total=0, approved=0, reindex=False):
+        """Shift denormalized comment counters of the post in one UPDATE and invalidate its pages.
+
+        Post is reindexed only when visible comments changed, since unapproved ones are not searchable.
+        """
+        Post.objects.filter(pk=self.post_id).update(comment_count=F('comment_count') + total,
+                                                    approved_comment_count=F('approved_comment_count') + approved,
+                                                    comments_updated_at=timezone.now())
+        if reindex:
+            search.update_post.delay(self.post_id)
+        bump_post(self.post_id, comments_only=True)
 
     def __str__(self):
         """Render Comment instance as its text by default when stringifying."""
         return self.text
+
+
+class Job(models.Model):
+    """Deferred call of a task function, executed by ``run_jobs`` worker."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = ((PENDING, 'Pending'), (RUNNING, 'Running'), (FAILED, 'Failed'))
+
+    name = models.CharField(max_length=200)
+    payload = models.TextField(default='{}')
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_date = models.DateTimeField(default=timezone.now)
+    run_after = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=32, blank=True, db_index=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        index_together = [('status', 'run_after')]
+
+    def __str__(self):
+        """Render job as name of its task."""
+        return self.name
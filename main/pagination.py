@@ -0,0 +1,123 @@
+"""Keyset (cursor) pagination.
+
+Pages are addressed by the sort key of a boundary row instead of an offset,
+so fetching a deep page costs the same index seek as fetching the first one.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import Http404
+from django.utils import timezone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(value, pk):
+    """Encode a ``(datetime, pk)`` sort key into an URL-safe string."""
+    delta = value - EPOCH
+    timestamp = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+    return '{}_{}'.format(timestamp, pk)
+
+
+def decode_cursor(cursor):
+    """Decode string produced by ``encode_cursor`` or raise ``Http404``."""
+    try:
+        timestamp, pk = cursor.split('_')
+        return EPOCH + timedelta(microseconds=int(timestamp)), int(pk)
+    except (ValueError, OverflowError, OSError):
+        raise Http404('Invalid cursor.')
+
+
+class KeysetPage:
+    """One page of objects together with cursors of its neighbours."""
+
+    def __init__(self, object_list, field, next_cursor=None, previous_cursor=None):
+        """Remember page objects and boundary cursors."""
+        self.object_list = object_list
+        self.field = field
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        """Iterate over objects on the page."""
+        return iter(self.object_list)
+
+    def __len__(self):
+        """Return amount of objects on the page."""
+        return len(self.object_list)
+
+    def has_next(self):
+        """Check whether there is a page after this one."""
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        """Check whether there is a page before this one."""
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        """Check whether the result set spans more than one page."""
+        return self.has_next() or self.has_previous()
+
+
+def _seek(field, value, pk, forward, descending):
+    """Build condition selecting rows that lie after/before the given key."""
+    lookup = 'lt' if forward == descending else 'gt'
+    return (Q(**{'{}__{}'.format(field, lookup): value}) |
+            Q(**{field: value, 'pk__{}'.format(lookup): pk}))
+
+
+def paginate_keyset(queryset, field, per_page, after=None, before=None, descending=True):
+    """Return ``KeysetPage`` of ``queryset`` ordered by ``(field, pk)``.
+
+    ``after`` and ``before`` are cursors taken from a neighbouring page.
+    Only ``per_page + 1`` rows are ever fetched from the database.
+    """
+    prefix = '-' if descending else ''
+    forward = before is None
+    if forward:
+        ordering = (prefix + field, prefix + 'pk')
+    else:
+        ordering = (field, 'pk') if descending else ('-' + field, '-pk')
+    cursor = after if forward else before
+    if cursor:
+        queryset = queryset.filter(_seek(field, *decode_cursor(cursor), forward=forward, descending=descending))
+    rows = list(queryset.order_by(*ordering)[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+    if not rows:
+        return KeysetPage(rows, field)
+    if forward:
+        has_next, has_previous = has_more, bool(cursor)
+    else:
+        has_next, has_previous = True, has_more
+    first, last = rows[0], rows[-1]
+    return KeysetPage(rows, field,
+                      next_cursor=encode_cursor(getattr(last, field), last.pk) if has_next else None,
+                      previous_cursor=encode_cursor(getattr(first, field), first.pk) if has_previous else None)
+
+
+class KeysetPaginationMixin:
+    """Make ``ListView`` paginate its queryset with ``paginate_keyset``.
+
+    Cursors are read from ``after``/``before`` GET parameters, and page
+    size from the setting named by ``paginate_by_setting``, so it can be
+    tuned per deployment.
+    """
+
+    keyset_field = 'published_date'
+    keyset_descending = True
+    paginate_by_setting = 'POSTS_PER_PAGE'
+
+    def get_paginate_by(self, queryset):
+        """Return page size from settings."""
+        return getattr(settings, self.paginate_by_setting)
+
+    def paginate_queryset(self, queryset, page_size):
+        """Return page of the queryset in the same format ``ListView`` expects."""
+        page = paginate_keyset(queryset, self.keyset_field, page_size,
+                               after=self.request.GET.get('after'), before=self.request.GET.get('before'),
+                               descending=self.keyset_descending)
+        return None, page, page.object_list, page.has_other_pages()
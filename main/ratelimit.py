@@ -0,0 +1,78 @@
+"""Token bucket rate limits for write endpoints.
+
+Every bucket holds up to ``burst`` tokens and gets ``per_minute`` of them
+back every minute; each request takes one token and is answered with 429
+when none is left. Buckets live in the cache framework, so all processes
+sharing the cache share the limits. Reading and writing a bucket is not
+atomic, which lets concurrent requests slip by a token or two.
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+
+def client_ip(request, **kwargs):
+    """Return address of the client, as seen by the outermost of ``RATE_LIMIT_TRUSTED_PROXIES``.
+
+    Behind proxies ``REMOTE_ADDR`` is the closest proxy itself, so all
+    clients would share one bucket. Every proxy appends the address it was
+    connected from to X-Forwarded-For, anything before the entry of the
+    outermost one may come from the client and is not trusted.
+    """
+    proxies = settings.RATE_LIMIT_TRUSTED_PROXIES
+    forwarded = [address.strip() for address in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+    if proxies and len(forwarded) >= proxies and forwarded[-proxies]:
+        return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def post_id(request, **kwargs):
+    """Return id of the post the request is about."""
+    return kwargs['pk']
+
+
+def take(name, identity, now=None):
+    """Take a token from the bucket and return seconds to wait when it is empty, otherwise 0."""
+    if settings.RATE_LIMITS.get(name) is None:
+        return 0
+    burst, per_minute = settings.RATE_LIMITS[name]
+    now = time.time() if now is None else now
+    key = 'main:ratelimit:{}:{}'.format(name, identity)
+    tokens, updated = cache.get(key, (burst, now))
+    tokens = min(burst, tokens + (now - updated) * per_minute / 60)
+    if tokens < 1:
+        return (1 - tokens) * 60 / per_minute
+    # Bucket which is not touched until it is full again can be forgotten
+    cache.set(key, (tokens - 1, now), math.ceil(burst * 60 / per_minute))
+    return 0
+
+
+def rate_limit(*buckets):
+    """Decorate a view to limit its POST requests.
+
+    ``buckets`` are ``(name, identity)`` pairs, where ``name`` is a key of
+    ``RATE_LIMITS`` setting and ``identity`` is called with request and
+    view kwargs to tell whose bucket it is.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method == 'POST':
+                for name, identity in buckets:
+                    wait = take(name, identity(request, **kwargs))
+                    if wait:
+                        return too_many_requests(wait)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def too_many_requests(wait):
+    """Return 429 response telling when to try again."""
+    response = HttpResponse('Too many requests, try again later.', status=429, content_type='text/plain')
+    response['Retry-After'] = str(math.ceil(wait))
+    return response
@@ -0,0 +1,64 @@
+"""Routing of read-only queries to database replicas.
+
+Replicas are only read from while ``ReplicaMiddleware`` handles an
+anonymous GET of a view with ``replica_reads`` attribute set, everything
+else stays on the primary. Requests writing to the database send back a
+cookie keeping their client on the primary for a while, so people see
+their own posts and comments before replicas catch up. Changes of posts
+keep all readers on the primary for the same time, see ``main.cache``.
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+
+
+def read_from_replica(enabled):
+    """Switch reads of the current thread to replicas or back to the primary."""
+    _state.replica = enabled
+
+
+def reset():
+    """Forget state of the previous request handled by the current thread."""
+    _state.replica = False
+    _state.wrote = False
+
+
+def wrote():
+    """Tell if the current request has written to the database."""
+    return getattr(_state, 'wrote', False)
+
+
+def _is_primary(alias):
+    """Tell if the alias points to the primary database, as test mirrors do."""
+    location = ('ENGINE', 'HOST', 'PORT', 'NAME')
+    primary = connections.databases[DEFAULT_DB_ALIAS]
+    replica = connections.databases.get(alias, {})
+    return [primary.get(key) for key in location] == [replica.get(key) for key in location]
+
+
+class ReplicaRouter:
+    """Send reads to a random replica in replica mode and remember writes."""
+
+    def db_for_read(self, model, **hints):
+        """Pick a replica if reads of the current request may go there."""
+        if getattr(_state, 'replica', False) and settings.REPLICA_DATABASES:
+            alias = random.choice(settings.REPLICA_DATABASES)
+            if not _is_primary(alias):
+                return alias
+
+    def db_for_write(self, model, **hints):
+        """Leave writes on the primary, noting that the request made one."""
+        _state.wrote = True
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allow any relation, replicas hold the same data as the primary."""
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        """Skip migrations of replicas, they get their schema by replication."""
+        if db in settings.REPLICA_DATABASES:
+            return False
@@ -0,0 +1,182 @@
+"""Full-text search over published posts and their approved comments.
+
+Every post gets one document in an inverted index, kept in sync by
+``Post`` and ``Comment`` whenever they change. PostgreSQL stores weighted
+``tsvector`` documents in a GIN-indexed table and SQLite uses an FTS5
+virtual table. Other backends fall back to ``LIKE`` scans.
+"""
+import re
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .jobs import task
+
+TABLE = 'main_post_search'
+
+
+class SearchBackend:
+    """Plain ``LIKE`` search for databases without a supported full-text index."""
+
+    def create(self, cursor):
+        """Create storage of the index."""
+
+    def drop(self, cursor):
+        """Remove storage of the index."""
+
+    def index(self, cursor, pk, title, body):
+        """Store or replace document of the post."""
+
+    def remove(self, cursor, pk):
+        """Remove document of the post."""
+
+    def search(self, cursor, query, limit):
+        """Return ids of published posts matching query, most relevant first."""
+        from .models import Post
+        condition = Q()
+        for word in query.split():
+            condition &= Q(title__icontains=word) | Q(text__icontains=word)
+        posts = Post.objects.using(cursor.db.alias).published().filter(condition).order_by('-published_date')
+        return list(posts.values_list('pk', flat=True)[:limit])
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Weighted ``tsvector`` documents in a GIN index."""
+
+    def create(self, cursor):
+        """Create table with documents and GIN index over them."""
+        cursor.execute('CREATE TABLE {0} (post_id integer PRIMARY KEY REFERENCES main_post (id) '
+                       'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, document tsvector NOT NULL)'.format(TABLE))
+        cursor.execute('CREATE INDEX {0}_document ON {0} USING GIN (document)'.format(TABLE))
+
+    def drop(self, cursor):
+        """Drop table with documents."""
+        cursor.execute('DROP TABLE IF EXISTS {}'.format(TABLE))
+
+    def index(self, cursor, pk, title, body):
+        """Store title with higher weight than text and comments."""
+        cursor.execute('INSERT INTO {} (post_id, document) VALUES '
+                       '(%s, setweight(to_tsvector(%s::regconfig, %s), \'A\') || '
+                       'setweight(to_tsvector(%s::regconfig, %s), \'B\')) '
+                       'ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document'.format(TABLE),
+                       [pk, settings.SEARCH_CONFIG, title, settings.SEARCH_CONFIG, body])
+
+    def remove(self, cursor, pk):
+        """Delete document row."""
+        cursor.execute('DELETE FROM {} WHERE post_id = %s'.format(TABLE), [pk])
+
+    def search(self, cursor, query, limit):
+        """Rank matches with ``ts_rank``."""
+        cursor.execute('SELECT s.post_id FROM {} s JOIN main_post p ON p.id = s.post_id, '
+                       'plainto_tsquery(%s::regconfig, %s) query '
+                       'WHERE s.document @@ query AND p.published_date <= %s '
+                       'ORDER BY ts_rank(s.document, query) DESC, p.published_date DESC LIMIT %s'.format(TABLE),
+                       [settings.SEARCH_CONFIG, query, timezone.now(), limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+class SqliteSearchBackend(SearchBackend):
+    """FTS5 virtual table with post ids as rowids."""
+
+    def create(self, cursor):
+        """Create FTS5 table."""
+        cursor.execute("CREATE VIRTUAL TABLE {} USING fts5(title, body, tokenize='porter unicode61')".format(TABLE))
+
+    def drop(self, cursor):
+        """Drop FTS5 table."""
+        cursor.execute('DROP TABLE IF EXISTS {}'.format(TABLE))
+
+    def index(self, cursor, pk, title, body):
+        """Replace document row."""
+        self.remove(cursor, pk)
+        cursor.execute('INSERT INTO {} (rowid, title, body) VALUES (%s, %s, %s)'.format(TABLE), [pk, title, body])
+
+    def remove(self, cursor, pk):
+        """Delete document row."""
+        cursor.execute('DELETE FROM {} WHERE rowid = %s'.format(TABLE), [pk])
+
+    def search(self, cursor, query, limit):
+        """Rank matches with ``bm25``, counting title ten times more than the rest."""
+        # Quote every word, so user input is never parsed as FTS5 query syntax
+        words = ' '.join('"{}"'.format(word) for word in re.findall(r'\w+', query))
+        if not words:
+            return []
+        cursor.execute('SELECT main_post.id FROM {0} JOIN main_post ON main_post.id = {0}.rowid '
+                       'WHERE {0} MATCH %s AND main_post.published_date <= %s '
+                       'ORDER BY bm25({0}, 10.0, 1.0), main_post.published_date DESC LIMIT %s'.format(TABLE),
+                       [words, timezone.now(), limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend(),
+    'sqlite': SqliteSearchBackend(),
+}
+
+_fts5 = {}
+
+
+def has_fts5(connection):
+    """Tell if SQLite library of the connection was built with FTS5, checking once per database."""
+    if connection.alias not in _fts5:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            _fts5[connection.alias] = 'ENABLE_FTS5' in [row[0] for row in cursor.fetchall()]
+    return _fts5[connection.alias]
+
+
+def get_backend(connection):
+    """Return search backend suitable for the database connection, ``LIKE`` scans if SQLite lacks FTS5."""
+    if connection.vendor == 'sqlite' and not has_fts5(connection):
+        return SearchBackend()
+    return BACKENDS.get(connection.vendor, SearchBackend())
+
+
+@task
+def update_post(pk, using=DEFAULT_DB_ALIAS):
+    """Index the post with its approved comments, or drop it from index if it is a draft."""
+    from .models import Comment, Post
+    connection = connections[using]
+    backend = get_backend(connection)
+    post = Post.objects.using(using).filter(pk=pk, published_date__isnull=False).values_list('title', 'text').first()
+    with connection.cursor() as cursor:
+        if post is None:
+            backend.remove(cursor, pk)
+            return
+        comments = Comment.objects.using(using).filter(post=pk, is_approved=True).values_list('text', flat=True)
+        backend.index(cursor, pk, post[0], '\n'.join([post[1]] + list(comments)))
+
+
+def remove_post(pk, using=DEFAULT_DB_ALIAS):
+    """Drop the post from index."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        get_backend(connection).remove(cursor, pk)
+
+
+def search(query, limit=None, using=None):
+    """Return ids of published posts matching query, most relevant first, reading from routed database by default."""
+    from .models import Post
+    if not query.strip():
+        return []
+    using = using or router.db_for_read(Post)
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        return get_backend(connection).search(cursor, query, limit or settings.SEARCH_MAX_RESULTS)
+
+
+def rebuild(using=DEFAULT_DB_ALIAS):
+    """Recreate the whole index from scratch and return amount of indexed posts."""
+    from .models import Post
+    connection = connections[using]
+    backend = get_backend(connection)
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        backend.drop(cursor)
+        backend.create(cursor)
+    indexed = 0
+    for pk in Post.objects.using(using).filter(published_date__isnull=False).values_list('pk', flat=True).iterator():
+        update_post(pk, using)
+        indexed += 1
+    return indexed
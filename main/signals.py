@@ -0,0 +1,6 @@
+"""Signals sent by the blog."""
+from django.dispatch import Signal
+
+# Sent with ``post`` when it becomes visible to readers, right on saving or
+# by ``run_scheduler`` once its scheduled publishing date comes
+post_published = Signal(providing_args=['post'])
@@ -0,0 +1,136 @@
+"""Profiling of the web application startup.
+
+Run as ``python -m main.startup [URL ...]`` in a fresh interpreter, it
+times every module imported while loading ``blog.wsgi``, makes warm-up
+requests to the application and prints the results as JSON. Python
+before 3.7 has no ``-X importtime``, so imports are timed by a finder
+wrapping loaders of other finders.
+"""
+import importlib.abc
+import json
+import resource
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+
+class _TimedLoader:
+    """Loader measuring execution of modules loaded by another one."""
+
+    def __init__(self, loader, timings, stack):
+        """Wrap ``loader``, storing ``{module: (cumulative, self)}`` seconds into ``timings``."""
+        self.loader = loader
+        self.timings = timings
+        self.stack = stack
+
+    def __getattr__(self, name):
+        """Act as the wrapped loader."""
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        """Let the wrapped loader create the module."""
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        """Execute module, noting time spent in it without modules it has imported."""
+        self.stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.timings[module.__name__] = (elapsed, elapsed - self.stack.pop())
+            if self.stack:
+                self.stack[-1] += elapsed
+            module.__loader__ = self.loader
+            if getattr(module, '__spec__', None) is not None:
+                module.__spec__.loader = self.loader
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """Finder timing imports of modules found by the rest of ``sys.meta_path``."""
+
+    def __init__(self):
+        """Start with nothing measured."""
+        self.timings = {}
+        self._stack = []
+
+    def find_spec(self, name, path, target=None):
+        """Find module with other finders and wrap its loader."""
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _TimedLoader(spec.loader, self.timings, self._stack)
+        return spec
+
+    def __enter__(self):
+        """Start timing imports."""
+        sys.meta_path.insert(0, self)
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop timing imports."""
+        sys.meta_path.remove(self)
+
+
+def rss():
+    """Return resident memory of the current process in KiB."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    # Peak instead of current size where /proc is missing, in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def request(application, url):
+    """Make GET request to the WSGI application, return response status code."""
+    path, _, query = url.partition('?')
+    environ = {'PATH_INFO': path, 'QUERY_STRING': query}
+    setup_testing_defaults(environ)
+    statuses = []
+    response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        for _ in response:
+            pass
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+    return int(statuses[0].split()[0])
+
+
+def profile(urls, requests):
+    """Load the application and warm it up, return measurements as a dict."""
+    rss_before = rss()
+    started = time.perf_counter()
+    with ImportTimer() as timer:
+        from blog.wsgi import application
+    import_seconds = time.perf_counter() - started
+    rss_loaded = rss()
+    statuses = {}
+    for url in urls:
+        for _ in range(requests):
+            statuses[url] = request(application, url)
+    return {
+        'import_seconds': import_seconds,
+        'modules': timer.timings,
+        'rss_before': rss_before,
+        'rss_loaded': rss_loaded,
+        'rss_warm': rss(),
+        'statuses': statuses,
+    }
+
+
+if __name__ == '__main__':
+    requests = int(sys.argv[1])
+    json.dump(profile(sys.argv[2:], requests), sys.stdout)
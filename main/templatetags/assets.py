@@ -0,0 +1,43 @@
+"""Template tags linking stylesheets so pages are painted before all of them load."""
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.contrib.staticfiles.templatetags.staticfiles import static
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+_contents = {}
+
+
+def _read(path):
+    """Return content of the static file, read once per process outside of development."""
+    if path not in _contents or settings.DEBUG:
+        if staticfiles_storage.exists(path):
+            with staticfiles_storage.open(path) as asset:
+                content = asset.read().decode()
+        else:
+            with open(finders.find(path), encoding='utf-8') as asset:
+                content = asset.read()
+        _contents[path] = content
+    return _contents[path]
+
+
+@register.simple_tag
+def critical_css(path):
+    """Put the stylesheet into the page itself when ``CRITICAL_CSS`` is on."""
+    if not settings.CRITICAL_CSS:
+        return ''
+    return format_html('<style>{}</style>', mark_safe(_read(path)))
+
+
+@register.simple_tag
+def stylesheet(path):
+    """Link the stylesheet, loading it without blocking the first paint when critical CSS is inlined."""
+    url = static(path)
+    if not settings.CRITICAL_CSS:
+        return format_html('<link rel="stylesheet" href="{}">', url)
+    return format_html('<link rel="preload" href="{0}" as="style" onload="this.rel=\'stylesheet\'">'
+                       '<noscript><link rel="stylesheet" href="{0}"></noscript>', url)
@@ -0,0 +1,66 @@
+"""Tests for admin lists of big tables."""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from main.admin import EstimatedCountPaginator
+from main.models import Comment, Post
+
+
+class AdminTest(TestCase):
+    """Changelists of posts and comments."""
+
+    def setUp(self):
+        """Log superuser in."""
+        cache.clear()
+        self.user = User.objects.create(username='testuser', is_superuser=True, is_staff=True)
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.post = Post.objects.create(author=self.user, title='Test', text='superText',
+                                        published_date=timezone.now())
+
+    def changelist_queries(self, url):
+        """Return amount of queries made by rendering the changelist."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        return len(queries)
+
+    def test_changelist_queries(self):
+        """Check that authors and posts are joined, so the amount of queries does not grow with rows."""
+        for url, create in ((reverse('admin:main_post_changelist'),
+                             lambda: Post.objects.create(author=self.user, title='Test', text='superText')),
+                            (reverse('admin:main_comment_changelist'),
+                             lambda: Comment.objects.create(post=self.post, author='guest', text='good'))):
+            create()
+            queries = self.changelist_queries(url)
+            for _ in range(5):
+                create()
+            self.assertEqual(queries, self.changelist_queries(url))
+
+    def test_comments_without_post_texts(self):
+        """Check that comments are listed with titles of their posts, not with whole posts."""
+        Comment.objects.create(post=self.post, author='guest', text='good')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:main_comment_changelist'))
+        self.assertContains(response, 'Test')
+        joined = [query['sql'] for query in queries if 'main_comment' in query['sql'] and 'main_post' in query['sql']]
+        self.assertTrue(joined)
+        for sql in joined:
+            self.assertNotIn('"main_post"."text"', sql)
+
+    def test_estimated_count(self):
+        """Unfiltered big tables are sized by statistics, filtered lists are counted."""
+        for _ in range(3):
+            Comment.objects.create(post=self.post, author='guest', text='good')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Comment.objects.create(post=self.post, author='guest', text='good')
+        with override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=0):
+            self.assertEqual(3, EstimatedCountPaginator(Comment.objects.all(), 10).count)
+            self.assertEqual(4, EstimatedCountPaginator(Comment.objects.filter(is_approved=False), 10).count)
+        self.assertEqual(4, EstimatedCountPaginator(Comment.objects.all(), 10).count)
@@ -0,0 +1,99 @@
+"""Tests for JSON API."""
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from main.models import Comment, Post
+
+
+class ApiTest(TestCase):
+    """Testing JSON API."""
+
+    def setUp(self):
+        """Prepare data for testing."""
+        self.user = User.objects.create(username='testuser')
+        now = timezone.now()
+        self.posts = [Post.objects.create(author=self.user, title='Post {}'.format(number), text='superText',
+                                          published_date=now - timedelta(days=number)) for number in range(5)]
+        Post.objects.create(author=self.user, title='Draft', text='draftText')
+        for post in self.posts[:3]:
+            Comment.objects.create(post=post, author='guest', text='approved').approve()
+            Comment.objects.create(post=post, author='guest', text='pending')
+
+    def get_json(self, url, **params):
+        """Request the API and return decoded response body."""
+        response = self.client.get(url, params)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('application/json', response['Content-Type'])
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return json.loads(content.decode())
+
+    @override_settings(API_PAGE_SIZE=2)
+    def test_post_list(self):
+        """Check that posts are listed page by page with selected fields only."""
+        with self.assertNumQueries(4):
+            page = self.get_json(reverse('api_post_list'))
+        self.assertListEqual([post['title'] for post in page['results']], ['Post 0', 'Post 1'])
+        first = page['results'][0]
+        self.assertEqual(first.pop('published_date'), DjangoJSONEncoder().default(self.posts[0].published_date))
+        self.assertDictEqual({key: value for key, value in first.items() if key != 'updated_at'},
+                             {'id': self.posts[0].pk, 'title': 'Post 0', 'author': 'testuser',
+                              'excerpt': 'superText', 'comment_count': 1})
+        self.assertIsNone(page['previous'])
+        titles = []
+        while page['next']:
+            page = self.get_json(reverse('api_post_list'), after=page['next'], fields='title')
+            titles.extend(post['title'] for post in page['results'])
+            self.assertTrue(all(list(post) == ['title'] for post in page['results']))
+        self.assertListEqual(titles, ['Post 2', 'Post 3', 'Post 4'])
+
+    def test_only_selected_columns(self):
+        """Check that columns of fields which were not asked for are not read."""
+        with self.assertNumQueries(4) as queries:
+            self.get_json(reverse('api_post_list'), fields='id,title,comment_count')
+        self.assertNotIn('"main_post"."text', queries.captured_queries[-1]['sql'])
+        self.assertNotIn('"main_post"."excerpt"', queries.captured_queries[-1]['sql'])
+
+    def test_post_detail_and_comments(self):
+        """Published posts are shown with their approved comments only."""
+        post = self.posts[0]
+        data = self.get_json(reverse('api_post_detail', kwargs={'pk': post.pk}), fields='title,html')
+        self.assertDictEqual(data, {'title': 'Post 0', 'html': 'superText'})
+        comments = self.get_json(reverse('api_comment_list', kwargs={'pk': post.pk}))
+        self.assertListEqual([comment['text'] for comment in comments['results']], ['approved'])
+        draft = Post.objects.get(title='Draft')
+        self.assertEqual(404, self.client.get(reverse('api_post_detail', kwargs={'pk': draft.pk})).status_code)
+        self.assertEqual(404, self.client.get(reverse('api_comment_list', kwargs={'pk': draft.pk})).status_code)
+
+    def test_conditional_get(self):
+        """Unchanged responses are answered with 304, different URLs have different ETags."""
+        post = self.posts[0]
+        urls = [reverse('api_post_list'), reverse('api_post_detail', kwargs={'pk': post.pk}),
+                reverse('api_comment_list', kwargs={'pk': post.pk})]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        self.assertEqual(len(set(etags)), 3)
+        for url, etag in zip(urls, etags):
+            self.assertEqual(304, self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code)
+        Comment.objects.create(post=post, author='guest', text='new').approve()
+        for url, etag in zip(urls, etags):
+            self.assertEqual(200, self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code)
+
+    def test_unknown_field(self):
+        """Asking for fields which do not exist is an error."""
+        response = self.client.get(reverse('api_post_list'), {'fields': 'title,password'})
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(json.loads(response.content.decode()), {'error': 'Unknown fields: password.'})
+
+    def test_invalid_parameters(self):
+        """Invalid page size or cursor is an error answered in JSON."""
+        for params in [{'limit': 'many'}, {'after': 'nonsense'}, {'before': '1_x'}]:
+            response = self.client.get(reverse('api_post_list'), params)
+            self.assertEqual(400, response.status_code)
+            self.assertEqual(response['Content-Type'], 'application/json')
+            self.assertIn('error', json.loads(response.content.decode()))
@@ -0,0 +1,63 @@
+"""Tests for static assets."""
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class StylesheetsTest(TestCase):
+    """Testing how pages load their stylesheets."""
+
+    def setUp(self):
+        """Start without cached pages."""
+        cache.clear()
+
+    def test_local_assets(self):
+        """Check that pages load stylesheets from the site only."""
+        response = self.client.get(reverse('post_list'))
+        self.assertContains(response, '<link rel="stylesheet" href="/static/css/base.css">', html=True)
+        self.assertNotContains(response, '//maxcdn')
+        self.assertNotContains(response, '//fonts.')
+        self.assertNotContains(response, '<style>')
+
+    @override_settings(CRITICAL_CSS=True)
+    def test_critical_css(self):
+        """Critical rules are inlined and other stylesheets do not block rendering."""
+        response = self.client.get(reverse('post_list'))
+        self.assertContains(response, '<style>/* Rules for the first paint')
+        self.assertContains(response, '<link rel="preload" href="/static/css/blog.css" as="style"')
+        self.assertContains(response, '<noscript><link rel="stylesheet" href="/static/css/blog.css"></noscript>')
+
+
+class CollectedAssetsTest(SimpleTestCase):
+    """Testing collected static files and how they are served."""
+
+    def setUp(self):
+        """Collect static files into a throwaway directory."""
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(STATIC_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0, stdout=StringIO())
+
+    def test_hashed_compressed_files(self):
+        """Check that files get content hashes in names, compressed variants and far-future expiry."""
+        with open(os.path.join(self.root, 'staticfiles.json')) as manifest:
+            hashed = json.load(manifest)['paths']['css/base.css']
+        self.assertRegex(hashed, r'^css/base\.[0-9a-f]{12}\.css$')
+        self.assertTrue(os.path.exists(os.path.join(self.root, hashed + '.gz')))
+        middleware = WhiteNoiseMiddleware()
+        response = middleware.process_request(RequestFactory().get('/static/' + hashed,
+                                                                   HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=315360000')
+        response = middleware.process_request(RequestFactory().get('/static/css/base.css'))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
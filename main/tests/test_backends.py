@@ -0,0 +1,77 @@
+"""Tests for database backends reusing connections."""
+import os
+import tempfile
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.utils import load_backend
+from django.test import SimpleTestCase, TestCase
+
+from blog.backends import get_pool
+
+
+class ConnectionReuseTest(SimpleTestCase):
+    """Testing pool and health checks on a throwaway SQLite file."""
+
+    def setUp(self):
+        """Prepare connection wrapper to a file database."""
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        backend = load_backend('blog.backends.sqlite3')
+        self.settings_dict = dict(connection.settings_dict, ENGINE='blog.backends.sqlite3', NAME=self.path,
+                                  CONN_MAX_AGE=60, HEALTH_CHECKS=True, POOL_SIZE=1)
+        self.wrapper = backend.DatabaseWrapper(self.settings_dict, alias='reuse-test')
+
+    def tearDown(self):
+        """Close everything and remove the file."""
+        self.wrapper.close()
+        get_pool('reuse-test', 1).clear()
+        os.remove(self.path)
+
+    def test_pool(self):
+        """Connection is handed back to the pool at the end of request and taken for the next one."""
+        self.wrapper.ensure_connection()
+        first = self.wrapper.connection
+        self.wrapper.close_if_unusable_or_obsolete()
+        self.assertIsNone(self.wrapper.connection)
+        self.wrapper.ensure_connection()
+        self.assertIs(self.wrapper.connection, first)
+
+    def test_pool_recycles_old_connections(self):
+        """Connection which outlived ``CONN_MAX_AGE`` is closed instead of pooled, even when taken from the pool."""
+        self.wrapper.ensure_connection()
+        first = self.wrapper.connection
+        close_at = self.wrapper.close_at
+        self.wrapper.close()
+        self.wrapper.ensure_connection()
+        self.assertIs(self.wrapper.connection, first)
+        self.assertEqual(self.wrapper.close_at, close_at)
+        self.wrapper.close_at = time.time() - 1
+        self.wrapper.close_if_unusable_or_obsolete()
+        self.assertIsNone(get_pool('reuse-test', 1).take())
+        self.wrapper.ensure_connection()
+        self.assertIsNot(self.wrapper.connection, first)
+
+    def test_health_check(self):
+        """Persistent connection which stopped working is replaced before use."""
+        self.settings_dict.update(CONN_MAX_AGE=None, POOL_SIZE=0)
+        self.wrapper.ensure_connection()
+        broken = self.wrapper.connection
+        broken.close()
+        self.wrapper.close_if_unusable_or_obsolete()
+        self.assertIs(self.wrapper.connection, broken)
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertIsNot(self.wrapper.connection, broken)
+
+
+class BenchmarkConnectionsTest(TestCase):
+    """Testing connection benchmark."""
+
+    def test_benchmark(self):
+        """Every setup is measured."""
+        stdout = StringIO()
+        call_command('benchmark_connections', requests=3, stdout=stdout)
+        self.assertEqual(len(stdout.getvalue().splitlines()), 4)
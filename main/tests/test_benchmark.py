@@ -0,0 +1,22 @@
+"""Tests for the benchmark of views."""
+from django.test import TestCase
+
+from main import benchmark
+
+
+class BenchmarkTest(TestCase):
+    """Run benchmark on a tiny blog to keep it working between real runs."""
+
+    def test_query_budgets(self):
+        """Every scenario is measured and stays within its query budget."""
+        results = benchmark.run([30, 60], requests=2, report=lambda line: None)
+        self.assertEqual(set(results), {30, 60})
+        budgets = {name: {'queries': budget['queries']} for name, budget in benchmark.load_budgets().items()}
+        self.assertSetEqual(set(results[60]), set(budgets))
+        self.assertListEqual(benchmark.over_budget(results, budgets), [])
+
+    def test_over_budget(self):
+        """Check that metrics above budget are reported."""
+        results = {100: {'post_list': {'queries': 5, 'p99_ms': 1}}}
+        failures = benchmark.over_budget(results, {'post_list': {'queries': 4, 'p99_ms': 10}})
+        self.assertListEqual(failures, ['post_list at 100 posts: queries is 5, budget is 4'])
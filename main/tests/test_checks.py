@@ -0,0 +1,56 @@
+"""Tests for system checks."""
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from main.checks import check_session_cache, check_shared_cache
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+MEMCACHED = {'default': {'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache'}}
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+    """Testing check of the cache shared by processes."""
+
+    @override_settings(DEBUG=False, PAGE_CACHE_TIMEOUT=600, CACHES=LOCMEM)
+    def test_local_cache(self):
+        """Page cache in memory of every process is an error in production."""
+        self.assertListEqual([error.id for error in check_shared_cache(None)], ['main.E001'])
+
+    def test_allowed_setups(self):
+        """Shared cache, development and disabled page cache are fine."""
+        for setup in [dict(DEBUG=False, PAGE_CACHE_TIMEOUT=600, CACHES=MEMCACHED),
+                      dict(DEBUG=True, PAGE_CACHE_TIMEOUT=600, CACHES=LOCMEM),
+                      dict(DEBUG=False, PAGE_CACHE_TIMEOUT=0, CACHES=LOCMEM)]:
+            with self.settings(**setup):
+                self.assertListEqual(check_shared_cache(None), [])
+
+    def test_default_settings(self):
+        """Check that a fresh checkout without any environment passes system checks."""
+        environ = {name: value for name, value in os.environ.items()
+                   if name not in ('DEBUG', 'CACHE_URL', 'PAGE_CACHE_TIMEOUT', 'SESSION_ENGINE')}
+        environ['DJANGO_SETTINGS_MODULE'] = 'blog.settings'
+        check = subprocess.run([sys.executable, 'manage.py', 'check'], cwd=str(settings.BASE_DIR), env=environ,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        self.assertEqual(check.returncode, 0, check.stdout.decode())
+
+
+class SessionCacheCheckTest(SimpleTestCase):
+    """Testing check of the cache keeping sessions."""
+
+    @override_settings(DEBUG=False, SESSION_ENGINE='django.contrib.sessions.backends.cached_db', CACHES=LOCMEM)
+    def test_local_cache(self):
+        """Check that sessions in memory of every process are an error in production."""
+        self.assertListEqual([error.id for error in check_session_cache(None)], ['main.E002'])
+
+    def test_allowed_setups(self):
+        """Shared cache, development and sessions without cache are fine."""
+        for setup in [dict(DEBUG=False, SESSION_ENGINE='django.contrib.sessions.backends.cached_db', CACHES=MEMCACHED),
+                      dict(DEBUG=True, SESSION_ENGINE='django.contrib.sessions.backends.cached_db', CACHES=LOCMEM),
+                      dict(DEBUG=False, SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies',
+                           CACHES=LOCMEM)]:
+            with self.settings(**setup):
+                self.assertListEqual(check_session_cache(None), [])
@@ -0,0 +1,82 @@
+"""Tests checking that hot queries are served by indexes."""
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from main.models import Post, Comment
+from main.pagination import _seek
+from main.views import ModerateComments, PostDraftList, PostList
+
+
+class IndexUsageTest(TestCase):
+    """Run EXPLAIN over querysets of views and look for index scans in the plan."""
+
+    def setUp(self):
+        """Prepare data for testing."""
+        self.user = User.objects.create(username='testuser')
+        self.post = Post.objects.create(author=self.user, title='Test', text='superText')
+        # One post in ten is a draft, like on a real blog
+        now = timezone.now()
+        Post.objects.bulk_create([Post(author=self.user, title='Test', text='superText',
+                                       published_date=None if number % 10 == 0 else now) for number in range(200)])
+        Comment.objects.create(post=self.post, author='guest', text='superComment')
+
+    def explain(self, queryset):
+        """Return query plan of the queryset as a single string."""
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                # SQLite has no statistics until asked to collect them, so it would guess index choice
+                cursor.execute('ANALYZE')
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            else:
+                # Tables are tiny here, so make planner show what it would do on a big one
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql, params)
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+    def assertIndexScan(self, queryset, index=None):
+        """Check that plan reads the table through an index without extra sorting."""
+        plan = self.explain(queryset)
+        if connection.vendor == 'sqlite':
+            self.assertRegex(plan, 'USING (COVERING )?INDEX')
+            self.assertNotIn('TEMP B-TREE', plan)
+        else:
+            self.assertIn('Index', plan)
+            self.assertNotIn('Seq Scan', plan)
+        if index:
+            self.assertIn(index, plan)
+
+    @skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'EXPLAIN format is backend specific')
+    def test_post_list_uses_index(self):
+        """Published posts are read in index order."""
+        queryset = PostList().get_queryset().order_by('-published_date', '-pk')[:11]
+        self.assertIndexScan(queryset)
+
+    @skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'EXPLAIN format is backend specific')
+    def test_drafts_use_index(self):
+        """Check that pages of drafts are read in index order."""
+        draft = Post.objects.filter(published_date=None).order_by('created_date', 'pk')[5]
+        queryset = PostDraftList.queryset.order_by('created_date', 'pk')
+        self.assertIndexScan(queryset[:11])
+        self.assertIndexScan(queryset.filter(_seek('created_date', draft.created_date, draft.pk, forward=True,
+                                                   descending=False))[:11])
+
+    @skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'EXPLAIN format is backend specific')
+    def test_approved_comments_use_index(self):
+        """Approved comments of a post are read in index order."""
+        queryset = Comment.objects.filter(post=self.post, is_approved=True).order_by('created_date')
+        self.assertIndexScan(queryset)
+
+    @skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'EXPLAIN format is backend specific')
+    def test_due_posts_use_index(self):
+        """Scheduler finds posts which became due through the announcing date index."""
+        self.assertIndexScan(Post.objects.unannounced())
+
+    @skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'EXPLAIN format is backend specific')
+    def test_moderation_queue_uses_index(self):
+        """Pending comments of all posts are read in index order."""
+        self.assertIndexScan(ModerateComments.queryset.order_by('created_date', 'pk')[:201])
@@ -0,0 +1,38 @@
+"""Tests for middleware."""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.test import TestCase, override_settings
+
+from main.middleware import query_shape, repeated_shapes
+from main.models import Post
+
+
+class RequestProfilingTest(TestCase):
+    """Testing request profiling middleware."""
+
+    def setUp(self):
+        """Prepare data for testing."""
+        cache.clear()
+        self.user = User.objects.create(username='testuser')
+        Post.objects.create(author=self.user, title='Test', text='superText')
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=1)
+    def test_sampled_request(self):
+        """Sampled request gets timings in header and a log line."""
+        with self.assertLogs('main.middleware', 'INFO') as logs:
+            response = self.client.get(reverse('post_list'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="4 queries", tpl;dur=[\d.]+, total;dur=')
+        self.assertIn('"queries": 4', logs.output[0])
+
+    def test_not_sampled_request(self):
+        """Check that requests out of sample are not measured."""
+        response = self.client.get(reverse('post_list'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_repeated_shapes(self):
+        """Check that queries which differ only in parameters are grouped together."""
+        queries = [{'sql': 'SELECT * FROM main_comment WHERE post_id = {}'.format(pk)} for pk in range(5)]
+        queries.append({'sql': "SELECT * FROM main_post WHERE title = 'it''s' AND id IN (1, 2, 3)"})
+        self.assertEqual(query_shape(queries[-1]['sql']), 'SELECT * FROM main_post WHERE title = ? AND id IN (...)')
+        self.assertDictEqual(repeated_shapes(queries, 5), {'SELECT * FROM main_comment WHERE post_id = ?': 5})
@@ -1,12 +1,20 @@
 """Tests for models."""
 from unittest.mock import patch
-from datetime import datetime
+from datetime import datetime, timedelta
+from io import StringIO
 
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
-from main.models import Post, Comment
+from main import jobs, search
+from main.cache import LIST_VERSION, get_versions, post_version
+from main.models import Post, Comment, Job
+from main.signals import post_published
 
 
 class ModelPostTest(TestCase):
@@ -29,6 +37,71 @@ class ModelPostTest(TestCase):
         self.assertEqual(self.test_post.published_date, datetime(day=1, month=4, year=2016,
                                                                  tzinfo=timezone.get_current_timezone()))
 
+    def test_publish_writes_publishing_columns_only(self):
+        """Publishing does not overwrite concurrent edits and does nothing to a visible post."""
+        Post.objects.filter(pk=self.test_post.pk).update(text='edited meanwhile')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(self.test_post.publish())
+        self.assertNotIn('"text"', queries.captured_queries[0]['sql'])
+        post = Post.objects.get(pk=self.test_post.pk)
+        self.assertEqual((post.text, post.published_date), ('edited meanwhile', self.test_post.published_date))
+        with self.assertNumQueries(1):
+            self.assertFalse(self.test_post.publish())
+        self.assertEqual(Post.objects.get(pk=self.test_post.pk).published_date, post.published_date)
+
+    def test_scheduled_publishing(self):
+        """Scheduled post is announced by scheduler when it becomes due, other posts on saving."""
+        published = []
+
+        def receiver(sender, post, **kwargs):
+            published.append(post.title)
+
+        post_published.connect(receiver)
+        self.addCleanup(post_published.disconnect, receiver)
+        now = timezone.now()
+        Post.objects.create(author=self.user, title='Now', text='superText', published_date=now)
+        self.assertListEqual(published, ['Now'])
+        self.test_post.publish(now + timedelta(hours=1))
+        self.assertTrue(self.test_post.is_scheduled())
+        self.test_post.save()
+        self.assertListEqual(published, ['Now'])
+        call_command('run_scheduler', once=True, stdout=StringIO())
+        self.assertListEqual(published, ['Now'])
+        version, = get_versions(LIST_VERSION)
+        # Scheduler stopped for longer than the post waited still announces it, once
+        with patch('django.utils.timezone.now', lambda: now + timedelta(days=1)):
+            call_command('run_scheduler', once=True, stdout=StringIO())
+            call_command('run_scheduler', once=True, stdout=StringIO())
+        self.assertListEqual(published, ['Now', 'Test'])
+        self.assertEqual(get_versions(LIST_VERSION), [version + 1])
+        self.assertEqual(Post.objects.get(pk=self.test_post.pk).announced_at, now + timedelta(days=1))
+        with patch('django.utils.timezone.now', lambda: now + timedelta(days=1)):
+            self.test_post.save()
+        self.assertListEqual(published, ['Now', 'Test'])
+
+    def test_post_text_html(self):
+        """Escaped HTML of text is stored on save and can be re-rendered by command."""
+        self.test_post.text = '<b>line</b>\nnext'
+        self.test_post.save()
+        self.assertEqual(Post.objects.get().text_html, '&lt;b&gt;line&lt;/b&gt;<br />next')
+        Post.objects.update(text_html='')
+        call_command('render_posts', stdout=StringIO())
+        self.assertEqual(Post.objects.get().text_html, '&lt;b&gt;line&lt;/b&gt;<br />next')
+
+    def test_rebuild_search_index(self):
+        """Command indexes published posts only."""
+        self.test_post.publish()
+        Post.objects.create(author=self.user, title='Draft', text='superText')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertListEqual(search.search('superText'), [self.test_post.pk])
+
+    def test_search_without_fts5(self):
+        """SQLite built without FTS5 falls back to LIKE scans."""
+        self.test_post.publish()
+        with patch.dict(search._fts5, {'default': False}):
+            self.assertIsInstance(search.get_backend(connection), search.SearchBackend)
+            self.assertListEqual(search.search('supertext'), [self.test_post.pk])
+
     def tearDown(self):
         """Clean data for new test."""
         del self.user
@@ -52,13 +125,178 @@ class ModelCommentTest(TestCase):
     def test_comment_approve(self):
         """Audit for right work of publish method in comment models."""
         self.comment.is_approved = False
-        self.comment.approve()
+        with self.assertNumQueries(3):
+            self.assertTrue(self.comment.approve())
         self.assertTrue(self.comment.is_approved)
+        with self.assertNumQueries(1):
+            self.assertFalse(self.comment.approve())
+        self.assertTrue(Comment.objects.get(pk=self.comment.pk).is_approved)
+
+    def test_comment_counters(self):
+        """Post counters follow adding, approving and removing of comments."""
+        self.test_post.refresh_from_db()
+        self.assertEqual((self.test_post.comment_count, self.test_post.approved_comment_count), (1, 0))
         self.comment.approve()
-        self.assertTrue(self.comment.is_approved)
+        self.comment.approve()
+        Comment.objects.create(post=self.test_post, author='guest', text='approved', is_approved=True)
+        self.test_post.refresh_from_db()
+        self.assertEqual((self.test_post.comment_count, self.test_post.approved_comment_count), (2, 2))
+        self.comment.delete()
+        self.test_post.refresh_from_db()
+        self.assertEqual((self.test_post.comment_count, self.test_post.approved_comment_count), (1, 1))
+
+    def test_bulk_moderation(self):
+        """Check that comments of many posts are approved and deleted at once, keeping counters of the posts right."""
+        other = Post.objects.create(author=self.user, title='Other', text='superText')
+        Comment.objects.bulk_create([Comment(post=post, author='guest', text='kitten')
+                                     for post in [self.test_post, other] * 30])
+        Post.objects.rebuild_comment_counts()
+        list_version, = get_versions(LIST_VERSION)
+        # Savepoint, SELECT, one UPDATE of all comments, then UPDATE and reindexing job of every post
+        with self.assertNumQueries(8):
+            self.assertEqual(Comment.objects.filter(text='kitten').approve(), 60)
+        self.assertEqual(Comment.objects.filter(text='kitten').approve(), 0)
+        self.assertEqual(get_versions(LIST_VERSION), [list_version + 2])
+        self.assertEqual(Post.objects.rebuild_comment_counts(), 0)
+        self.assertEqual(Post.objects.get(pk=other.pk).approved_comment_count, 30)
+        with self.assertNumQueries(6):
+            deleted, _ = Comment.objects.filter(post=other).delete()
+        self.assertEqual(deleted, 30)
+        self.assertEqual(Post.objects.rebuild_comment_counts(), 0)
+        self.assertEqual(Post.objects.get(pk=other.pk).comment_count, 0)
+
+    def test_rebuild_comment_counts(self):
+        """Command fixes counters that drifted from real amount of comments."""
+        Post.objects.update(comment_count=10, approved_comment_count=5)
+        call_command('rebuild_comment_counts', stdout=StringIO())
+        self.test_post.refresh_from_db()
+        self.assertEqual((self.test_post.comment_count, self.test_post.approved_comment_count), (1, 0))
 
     def tearDown(self):
         """Clean data for new test."""
         del self.user
         del self.test_post
         del self.comment
+
+
+class BlogTransferTest(TestCase):
+    """Testing export and import of blog data."""
+
+    def setUp(self):
+        """Prepare data for testing."""
+        self.user = User.objects.create(username='testuser')
+        self.post = Post.objects.create(author=self.user, title='Test', text='superText',
+                                        published_date=timezone.now())
+        self.draft = Post.objects.create(author=self.user, title='Draft', text='draftText')
+        Comment.objects.create(post=self.post, author='guest', text='superComment', is_approved=True)
+        Comment.objects.create(post=self.post, author='guest', text='pending')
+
+    def test_export_import(self):
+        """Exported posts and comments are imported back with derived data restored."""
+        exported = StringIO()
+        call_command('export_blog', chunk_size=1, stdout=exported, stderr=StringIO())
+        lines = exported.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        expected = list(Post.objects.order_by('pk').values_list('pk', 'title', 'published_date', 'text_html',
+                                                                'excerpt', 'comment_count', 'approved_comment_count'))
+        Post.objects.all().delete()
+        with patch('sys.stdin', StringIO(exported.getvalue())):
+            call_command('import_blog', batch_size=3, stdout=StringIO())
+        imported = list(Post.objects.order_by('pk').values_list('pk', 'title', 'published_date', 'text_html',
+                                                                'excerpt', 'comment_count', 'approved_comment_count'))
+        self.assertListEqual(imported, expected)
+        self.assertListEqual(search.search('superComment'), [self.post.pk])
+        self.assertEqual(Post.objects.create(author=self.user, title='New', text='superText').pk, self.draft.pk + 1)
+
+    def test_import_unknown_author(self):
+        """Import stops when author of a post does not exist."""
+        line = '{"model": "post", "id": 10, "author": "nobody", "title": "T", "text": "t", ' \
+               '"created_date": "2016-04-01T00:00:00+00:00", "published_date": null}\n'
+        with patch('sys.stdin', StringIO(line)), self.assertRaises(CommandError):
+            call_command('import_blog', stdout=StringIO())
+
+    def test_import_comments_of_existing_post(self):
+        """Check that comments imported to an existing post invalidate its counters, dates and cached pages."""
+        Post.objects.filter(pk=self.post.pk).update(comments_updated_at=timezone.now() - timedelta(days=1))
+        version, = get_versions(post_version(self.post.pk))
+        line = '{{"model": "comment", "id": 1000, "post": {}, "author": "guest", "text": "imported", ' \
+               '"created_date": "2016-04-01T00:00:00+00:00", "is_approved": true}}\n'.format(self.post.pk)
+        with patch('sys.stdin', StringIO(line)):
+            call_command('import_blog', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.approved_comment_count, 2)
+        self.assertGreater(self.post.comments_updated_at, timezone.now() - timedelta(minutes=1))
+        self.assertGreater(get_versions(post_version(self.post.pk))[0], version)
+
+    def test_import_twice(self):
+        """Importing rows which already exist stops with an error instead of a traceback."""
+        exported = StringIO()
+        call_command('export_blog', stdout=exported, stderr=StringIO())
+        with patch('sys.stdin', StringIO(exported.getvalue())), self.assertRaises(CommandError):
+            call_command('import_blog', stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 2)
+
+
+def failing_task(message):
+    """Task used to test retries."""
+    raise ValueError(message)
+
+
+failing_task = jobs.task(failing_task)
+
+
+class JobTest(TestCase):
+    """Testing background jobs."""
+
+    def setUp(self):
+        """Prepare data for testing."""
+        self.user = User.objects.create(username='testuser')
+        self.post = Post.objects.create(author=self.user, title='Test', text='superText', published_date=timezone.now())
+        call_command('run_jobs', once=True, stdout=StringIO())
+
+    def test_worker_runs_identical_jobs_once(self):
+        """Delayed tasks are stored, then run by worker in one batch."""
+        for text in ['first kitten', 'second kitten']:
+            Comment.objects.create(post=self.post, author='guest', text=text).approve()
+        self.assertEqual(Job.objects.count(), 2)
+        self.assertListEqual(search.search('kitten'), [])
+        with patch('main.search.update_post', wraps=search.update_post) as update_post:
+            call_command('run_jobs', once=True, stdout=StringIO())
+        update_post.assert_called_once_with(self.post.pk)
+        self.assertFalse(Job.objects.exists())
+        self.assertListEqual(search.search('kitten'), [self.post.pk])
+
+    @override_settings(JOBS_SYNC=True)
+    def test_sync_mode(self):
+        """Check that tasks run right away in synchronous mode."""
+        Comment.objects.create(post=self.post, author='guest', text='kitten').approve()
+        self.assertFalse(Job.objects.exists())
+        self.assertListEqual(search.search('kitten'), [self.post.pk])
+
+    @override_settings(JOBS_MAX_ATTEMPTS=2, JOBS_RETRY_DELAY=10)
+    def test_failed_job_retries(self):
+        """Failed job is retried later and given up after last attempt."""
+        failing_task.delay('boom')
+        with self.assertLogs('main.jobs', 'ERROR'):
+            self.assertEqual(jobs.run(jobs.claim(10)), 1)
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts, job.last_error), (Job.PENDING, 1, 'ValueError: boom'))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertListEqual(jobs.claim(10), [])
+        Job.objects.update(run_after=timezone.now())
+        with self.assertLogs('main.jobs', 'ERROR'):
+            jobs.run(jobs.claim(10))
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    @override_settings(JOBS_MAX_ATTEMPTS=2, JOBS_TIMEOUT=60)
+    def test_stale_job_gives_up(self):
+        """Check that a job left running by crashed workers counts attempts and fails after the last one."""
+        failing_task.delay('crash')
+        jobs.claim(10)
+        # Worker was killed while running the job, which is given back and taken again
+        Job.objects.update(claimed_at=timezone.now() - timedelta(minutes=2))
+        self.assertListEqual([job.attempts for job in jobs.claim(10)], [1])
+        Job.objects.update(claimed_at=timezone.now() - timedelta(minutes=2))
+        self.assertListEqual(jobs.claim(10), [])
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts, job.claimed_by), (Job.FAILED, 2, ''))
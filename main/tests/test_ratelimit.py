@@ -0,0 +1,50 @@
+"""Tests for rate limits."""
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from main.ratelimit import client_ip, take
+
+
+@override_settings(RATE_LIMITS={'test': (2, 30), 'off': None})
+class TakeTest(SimpleTestCase):
+    """Testing token buckets."""
+
+    def setUp(self):
+        """Start with empty buckets."""
+        cache.clear()
+
+    def test_bucket_refills(self):
+        """Burst is allowed at once, then tokens come back with time."""
+        self.assertEqual(take('test', 'a', now=100), 0)
+        self.assertEqual(take('test', 'a', now=100), 0)
+        self.assertEqual(take('test', 'a', now=100), 2)
+        self.assertEqual(take('test', 'b', now=100), 0)
+        self.assertAlmostEqual(take('test', 'a', now=101), 1)
+        self.assertEqual(take('test', 'a', now=102), 0)
+        self.assertEqual(take('test', 'a', now=102), 2)
+        # Idle bucket does not grow above burst
+        self.assertEqual(take('test', 'a', now=1000), 0)
+        self.assertEqual(take('test', 'a', now=1000), 0)
+        self.assertEqual(take('test', 'a', now=1000), 2)
+
+    def test_disabled_limit(self):
+        """Check that limits set to None never refuse."""
+        for _ in range(10):
+            self.assertEqual(take('off', 'a'), 0)
+
+
+class ClientIpTest(SimpleTestCase):
+    """Testing detection of client addresses."""
+
+    def test_forwarded_header(self):
+        """Check that address added by the outermost trusted proxy is used, falling back to the connection one."""
+        factory = RequestFactory()
+        request = factory.post('/', REMOTE_ADDR='10.0.0.254', HTTP_X_FORWARDED_FOR='1.1.1.1, 2.2.2.2, 10.0.0.1')
+        self.assertEqual(client_ip(request), '10.0.0.254')
+        with override_settings(RATE_LIMIT_TRUSTED_PROXIES=1):
+            self.assertEqual(client_ip(request), '10.0.0.1')
+            self.assertEqual(client_ip(factory.post('/', REMOTE_ADDR='10.0.0.2')), '10.0.0.2')
+        with override_settings(RATE_LIMIT_TRUSTED_PROXIES=2):
+            self.assertEqual(client_ip(request), '2.2.2.2')
+        with override_settings(RATE_LIMIT_TRUSTED_PROXIES=4):
+            self.assertEqual(client_ip(request), '10.0.0.254')
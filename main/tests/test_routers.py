@@ -0,0 +1,146 @@
+"""Tests for routing reads to replicas."""
+import os
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from django.views.generic import View
+
+from main import routers
+from main.middleware import ReplicaMiddleware
+from main.models import Comment, Post
+
+REPLICA = 'replica-test'
+
+
+class ReadingView(View):
+    """Tell which database reads go to."""
+
+    replica_reads = True
+
+    def get(self, request):
+        """Answer with alias of the database."""
+        return HttpResponse(routers.ReplicaRouter().db_for_read(Post) or 'default')
+
+
+@override_settings(REPLICA_DATABASES=[REPLICA])
+class ReplicaTestCase(TestCase):
+    """Test case with a replica in its own SQLite file, which replication never reaches."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Add the replica database with the schema of the models read in tests."""
+        handle, cls.replica_path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connections.databases[REPLICA] = dict(connections.databases[DEFAULT_DB_ALIAS], NAME=cls.replica_path,
+                                              TEST={})
+        with connections[REPLICA].schema_editor() as editor:
+            for model in (User, Post, Comment):
+                editor.create_model(model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Forget the replica and remove its file."""
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        os.remove(cls.replica_path)
+
+    def setUp(self):
+        """Start without recent changes which keep everybody on the primary."""
+        cache.clear()
+
+
+class ReplicaRoutingTest(ReplicaTestCase):
+    """Testing which database serves requests."""
+
+    def setUp(self):
+        """Prepare data for testing."""
+        super().setUp()
+        self.user = User.objects.create(username='testuser')
+        self.factory = RequestFactory()
+        self.middleware = ReplicaMiddleware()
+
+    def handle(self, request, user=None, view=ReadingView):
+        """Pass request through the middleware and return the response."""
+        request.user = user or AnonymousUser()
+        self.middleware.process_request(request)
+        view_func = view.as_view()
+        self.middleware.process_view(request, view_func, (), {})
+        return self.middleware.process_response(request, view_func(request))
+
+    def test_anonymous_reads(self):
+        """Check that anonymous readers of marked views read from replica."""
+        self.assertEqual(self.handle(self.factory.get('/')).content, REPLICA.encode())
+        self.assertEqual(routers.ReplicaRouter().db_for_read(Post), None)
+
+    def test_primary_reads(self):
+        """Authors, recent writers, readers of recent changes and views not marked for it do not read from replica."""
+        self.assertEqual(self.handle(self.factory.get('/'), user=self.user).content, b'default')
+        request = self.factory.get('/')
+        request.COOKIES['primary'] = '1'
+        self.assertEqual(self.handle(request).content, b'default')
+
+        class PrimaryView(ReadingView):
+            replica_reads = False
+
+        self.assertEqual(self.handle(self.factory.get('/'), view=PrimaryView).content, b'default')
+        Post.objects.create(author=self.user, title='Test', text='superText')
+        self.assertEqual(self.handle(self.factory.get('/')).content, b'default')
+
+    def test_comment_keeps_replicas(self):
+        """Check that a comment keeps only its author on the primary, not every reader."""
+        post = Post.objects.create(author=self.user, title='Test', text='superText', published_date=timezone.now())
+        cache.clear()
+        Comment.objects.create(post=post, author='guest', text='Super').approve()
+        self.assertEqual(self.handle(self.factory.get('/')).content, REPLICA.encode())
+
+    @override_settings(REPLICA_DATABASES=['default'])
+    def test_mirror(self):
+        """Replica pointing to the primary database is not used as a separate one."""
+        self.assertEqual(self.handle(self.factory.get('/')).content, b'default')
+
+
+class LaggingReplicaTest(ReplicaTestCase):
+    """Testing pages read from a replica which has not got the latest changes."""
+
+    @override_settings(PAGE_CACHE_TIMEOUT=600)
+    def test_changed_post(self):
+        """Check that pages of changed posts are rendered and cached from the primary until replicas catch up."""
+        user = User.objects.create(username='testuser')
+        post = Post.objects.create(author=user, title='Replicated', text='superText',
+                                   published_date=timezone.now() - timedelta(days=1))
+        User.objects.using(REPLICA).bulk_create([user])
+        Post.objects.using(REPLICA).bulk_create([Post.objects.get(pk=post.pk)])
+        url = reverse('post_detail', kwargs={'pk': post.pk})
+        cache.clear()
+        Post.objects.using(REPLICA).filter(pk=post.pk).update(title='Only on replica')
+        self.assertContains(self.client.get(url), 'Only on replica')
+        post.title = 'Changed'
+        post.save()
+        self.assertContains(self.client.get(url), 'Changed')
+        # Replica still lags behind when the change is not recent anymore, but the page is cached
+        cache.delete('main:changed')
+        self.assertContains(self.client.get(url), 'Changed')
+
+
+class StickyPrimaryTest(TestCase):
+    """Testing the cookie keeping writers on the primary."""
+
+    def test_sticky_after_write(self):
+        """Client which commented is kept on the primary for a while."""
+        post = Post.objects.create(author=User.objects.create(username='testuser'), title='Test', text='superText',
+                                   published_date=timezone.now())
+        response = self.client.get(reverse('post_detail', kwargs={'pk': post.pk}))
+        self.assertNotIn('primary', response.cookies)
+        response = self.client.post(reverse('add_comment_to_post', kwargs={'pk': post.pk}),
+                                    {'author': 'guest', 'text': 'Super'})
+        self.assertEqual(response.cookies['primary']['max-age'], 10)
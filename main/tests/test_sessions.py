@@ -0,0 +1,38 @@
+"""Tests for sessions cleanup."""
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+class ClearExpiredSessionsTest(TestCase):
+    """Testing batched deletion of expired sessions."""
+
+    def setUp(self):
+        """Store expired sessions and a live one."""
+        now = timezone.now()
+        for number in range(5):
+            Session.objects.create(session_key='expired{}'.format(number), session_data='',
+                                   expire_date=now - timedelta(days=number + 1))
+        Session.objects.create(session_key='live', session_data='', expire_date=now + timedelta(days=1))
+
+    def test_batches(self):
+        """Expired sessions are deleted a batch per statement, live ones are kept."""
+        stdout = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('clear_expired_sessions', batch_size=2, stdout=stdout)
+        self.assertListEqual(list(Session.objects.values_list('pk', flat=True)), ['live'])
+        deletes = [query['sql'] for query in queries if query['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 3)
+        self.assertIn('Deleted 5 expired session(s).', stdout.getvalue())
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_cookie_sessions(self):
+        """There is nothing to delete when sessions live in cookies."""
+        call_command('clear_expired_sessions', stdout=StringIO())
+        self.assertEqual(Session.objects.count(), 6)
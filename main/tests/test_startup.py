@@ -0,0 +1,35 @@
+"""Tests for profiling of the application startup."""
+import os
+import sys
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from main.startup import ImportTimer, rss
+
+
+class StartupTest(SimpleTestCase):
+    """Testing measurements of imports and memory."""
+
+    def test_import_timer(self):
+        """Imported modules are timed, with their own imports counted in cumulative time only."""
+        for name in ('json', 'json.decoder', 'json.scanner', 'json.encoder'):
+            self.addCleanup(sys.modules.__setitem__, name, sys.modules.pop(name))
+        with ImportTimer() as timer:
+            import json  # noqa: F401
+        self.assertIn('json.decoder', timer.timings)
+        cumulative, own = timer.timings['json']
+        self.assertLess(own, cumulative)
+        self.assertIsNot(timer, sys.meta_path[0])
+        self.assertGreater(rss(), 0)
+
+    def test_command(self):
+        """Startup of the application is profiled in a child process."""
+        stdout = StringIO()
+        # Child process connects to the database of the settings, not to the test one
+        with patch.dict(os.environ, DATABASE_URL='sqlite://:memory:'):
+            call_command('profile_startup', '/missing/', requests=1, top=3, stdout=stdout)
+        self.assertIn('blog.wsgi', stdout.getvalue())
+        self.assertIn('404  /missing/', stdout.getvalue())
@@ -1,15 +1,32 @@
 """Tests for views are at this file."""
+import sqlite3
+from unittest import skipUnless
 from unittest.mock import patch
-from datetime import datetime
+from datetime import datetime, timedelta
+from io import StringIO
 
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
+from django.utils.http import http_date
 
+from main import search
 from main.models import Post, Comment
 
 
+def has_full_text_index():
+    """Tell if the test database ranks search results, SQLite only does when it is built with FTS5."""
+    if connection.vendor == 'sqlite':
+        with sqlite3.connect(':memory:') as database:
+            return 'ENABLE_FTS5' in [row[0] for row in database.execute('PRAGMA compile_options')]
+    return connection.vendor == 'postgresql'
+
+
 class ViewsTest(TestCase):
     """Testing class for views."""
 
@@ -18,10 +35,13 @@ class ViewsTest(TestCase):
 
     def setUp(self):
         """Prepare data for testing."""
+        cache.clear()
         self.client = Client()
         self.user = User.objects.create(username='testuser', password='blablabla', is_superuser=True, is_staff=True,
                                         email='testuser@gmail.com', is_active=True)
 
+    # Moving the clock is not a content change, so it must not be hidden by cached pages
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
     def test_index_view_rendering(self):
         """Testing main page for render needed posts."""
         tz = timezone.get_current_timezone()
@@ -45,7 +65,7 @@ class ViewsTest(TestCase):
             self.assertNotContains(response, future_post)
         with patch('django.utils.timezone.now', lambda: datetime(day=1, month=4, year=3016, tzinfo=tz)):
             response = self.client.get(reverse('post_list'))
-            self.assertListEqual(list(response.context['posts']), [post, past_post, future_post])
+            self.assertListEqual(list(response.context['posts']), [future_post, post, past_post])
         response = self.client.get(reverse('post_list'))
         self.assertEqual(200, response.status_code)
         self.assertTemplateUsed(response, 'main/index.html')
@@ -53,13 +73,239 @@ class ViewsTest(TestCase):
         self.assertContains(response, past_post)
         self.assertNotContains(response, future_post)
 
+    @override_settings(POSTS_PER_PAGE=2)
+    def test_index_view_pagination(self):
+        """Main page is split into pages by cursor of the last shown post."""
+        tz = timezone.get_current_timezone()
+        same_date = datetime(day=1, month=3, year=2016, tzinfo=tz)
+        posts = [Post.objects.create(author=self.user, title='Test {}'.format(i), text='superText',
+                                     published_date=same_date) for i in range(3)]
+        posts.append(Post.objects.create(author=self.user, title='Old', text='superText',
+                                         published_date=datetime(day=1, month=3, year=2015, tzinfo=tz)))
+        response = self.client.get(reverse('post_list'))
+        page = response.context['page_obj']
+        self.assertListEqual(list(response.context['posts']), [posts[2], posts[1]])
+        self.assertFalse(page.has_previous())
+        self.assertContains(response, '?after={}'.format(page.next_cursor))
+        response = self.client.get(reverse('post_list'), {'after': page.next_cursor})
+        page = response.context['page_obj']
+        self.assertListEqual(list(response.context['posts']), [posts[0], posts[3]])
+        self.assertFalse(page.has_next())
+        response = self.client.get(reverse('post_list'), {'before': page.previous_cursor})
+        self.assertListEqual(list(response.context['posts']), [posts[2], posts[1]])
+        self.assertFalse(response.context['page_obj'].has_previous())
+        response = self.client.get(reverse('post_list'), {'after': 'garbage'})
+        self.assertEqual(404, response.status_code)
+
+    def test_index_view_query_count(self):
+        """Amount of queries on main page does not depend on amount of posts."""
+        def add_posts(amount):
+            for _ in range(amount):
+                post = Post.objects.create(author=self.user, title='Test', text='superText',
+                                           published_date=timezone.now())
+                Comment.objects.create(post=post, author='guest', text='superComment')
+
+        # One query for the page and three index lookups for its ETag
+        add_posts(2)
+        with self.assertNumQueries(4):
+            self.client.get(reverse('post_list'))
+        add_posts(5)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('post_list'))
+        self.assertContains(response, 'Comments: 1', count=7)
+
+    def test_list_views_skip_post_text(self):
+        """Check that lists show excerpts and never select full post bodies."""
+        text = 'superText ' * 100
+        Post.objects.create(author=self.user, title='Test', text=text, published_date=timezone.now())
+        Post.objects.create(author=self.user, title='Draft', text=text)
+        authorization = self.client.login(username=self.USERNAME, password=self.PASSWORD)
+        self.assertTrue(authorization)
+        for url in [reverse('post_list'), reverse('post_draft_list')]:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertContains(response, text[:100])
+            self.assertNotContains(response, text.strip())
+            for query in queries:
+                self.assertNotIn('"main_post"."text"', query['sql'])
+                self.assertNotIn('"main_post"."text_html"', query['sql'])
+
     def test_detail_view(self):
         """Testing detail page when post is not exist and when it exists."""
         response = self.client.get(reverse('post_detail', kwargs={'pk': 1}))
         self.assertEqual(404, response.status_code)
-        post = Post.objects.create(author=self.user, title='Test', text='superText')
-        response = self.client.get(reverse('post_detail', kwargs={'pk': post.pk}))
-        self.assertEqual(200, response.status_code)
+        post = Post.objects.create(author=self.user, title='Test', text='superText',
+                                   published_date=timezone.now() + timedelta(hours=1))
+        url = reverse('post_detail', kwargs={'pk': post.pk})
+        # Scheduled posts and drafts are shown to authors only
+        self.assertEqual(404, self.client.get(url).status_code)
+        self.client.force_login(self.user)
+        self.assertEqual(200, self.client.get(url).status_code)
+        self.client.logout()
+        post.publish()
+        self.assertEqual(200, self.client.get(url).status_code)
+
+    @override_settings(COMMENTS_PER_PAGE=2)
+    def test_detail_view_comments(self):
+        """Check that anonymous readers see only approved comments, page by page in one query."""
+        post = Post.objects.create(author=self.user, title='Test', text='superText', published_date=timezone.now())
+        approved = [Comment.objects.create(post=post, author='guest', text='approved {}'.format(i), is_approved=True)
+                    for i in range(3)]
+        Comment.objects.create(post=post, author='guest', text='pending')
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('post_detail', kwargs={'pk': post.pk}))
+        comments = response.context['comments']
+        self.assertListEqual(list(comments), approved[:2])
+        self.assertNotContains(response, 'pending')
+        response = self.client.get(reverse('post_detail', kwargs={'pk': post.pk}), {'after': comments.next_cursor})
+        self.assertListEqual(list(response.context['comments']), approved[2:])
+        authorization = self.client.login(username=self.USERNAME, password=self.PASSWORD)
+        self.assertTrue(authorization)
+        response = self.client.get(reverse('post_detail', kwargs={'pk': post.pk}),
+                                   {'after': response.context['comments'].previous_cursor})
+        self.assertContains(response, 'pending')
+
+    @override_settings(PAGE_CACHE_TIMEOUT=600)
+    def test_anonymous_page_cache(self):
+        """Check that anonymous readers get cached pages until the content changes."""
+        post = Post.objects.create(author=self.user, title='Test', text='superText', published_date=timezone.now())
+        urls = [reverse('post_list'), reverse('post_detail', kwargs={'pk': post.pk})]
+        for url in urls:
+            self.client.get(url)
+            with self.assertNumQueries(0):
+                self.assertContains(self.client.get(url), 'superText')
+                # Neither other hosts nor unknown parameters create new cache entries
+                self.assertContains(self.client.get(url, {'utm_source': 'x'}, HTTP_HOST='other.example'),
+                                    'superText')
+        comment = Comment.objects.create(post=post, author='guest', text='superComment')
+        comment.approve()
+        for url in urls:
+            with self.assertNumQueries(4 if url == urls[0] else 3):
+                self.client.get(url)
+        self.assertContains(self.client.get(urls[1]), 'superComment')
+        post.text = 'editedText'
+        post.save()
+        for url in urls:
+            self.assertContains(self.client.get(url), 'editedText')
+        authorization = self.client.login(username=self.USERNAME, password=self.PASSWORD)
+        self.assertTrue(authorization)
+        Post.objects.filter(pk=post.pk).update(text='bypassText', text_html='bypassText', excerpt='bypassText')
+        for url in urls:
+            self.assertContains(self.client.get(url), 'bypassText')
+        self.client.logout()
+        post.delete()
+        self.assertEqual(404, self.client.get(urls[1]).status_code)
+
+    def test_conditional_get(self):
+        """Unchanged pages are answered with 304 using ETag or Last-Modified."""
+        post = Post.objects.create(author=self.user, title='Test', text='superText', published_date=timezone.now())
+        for url in [reverse('post_list'), reverse('post_detail', kwargs={'pk': post.pk})]:
+            response = self.client.get(url)
+            etag, last_modified = response['ETag'], response['Last-Modified']
+            for headers in [{'HTTP_IF_NONE_MATCH': etag}, {'HTTP_IF_MODIFIED_SINCE': last_modified}]:
+                self.assertEqual(304, self.client.get(url, **headers).status_code)
+            Comment.objects.create(post=post, author='guest', text='superComment')
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(200, response.status_code)
+            self.assertNotEqual(etag, response['ETag'])
+        self.assertEqual(404, self.client.get(reverse('post_detail', kwargs={'pk': post.pk + 1})).status_code)
+
+    def test_conditional_get_after_deletion(self):
+        """Check that deleting a post changes validators of lists although no remaining row changes."""
+        Post.objects.create(author=self.user, title='Old', text='superText',
+                            published_date=timezone.now() - timedelta(days=1))
+        for url in [reverse('post_list'), reverse('post_feed_rss'), reverse('api_post_list')]:
+            post = Post.objects.create(author=self.user, title='New', text='superText', published_date=timezone.now())
+            last_modified = self.client.get(url)['Last-Modified']
+            # Last-Modified has a resolution of seconds
+            with patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(seconds=2)):
+                post.delete()
+            self.assertEqual(200, self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code)
+        cache.clear()
+        self.assertNotIn('Last-Modified', self.client.get(reverse('post_list')))
+
+    def test_conditional_get_going_live(self):
+        """Scheduled post going live changes its validators although its row stays the same."""
+        post = Post.objects.create(author=self.user, title='Test', text='superText',
+                                   published_date=timezone.now() + timedelta(hours=1))
+        url = reverse('post_detail', kwargs={'pk': post.pk})
+        self.client.force_login(self.user)
+        etag = self.client.get(url)['ETag']
+        self.client.logout()
+        # Post was scheduled a while ago and the time has come
+        published_date = timezone.now() - timedelta(minutes=1)
+        Post.objects.filter(pk=post.pk).update(published_date=published_date,
+                                               updated_at=published_date - timedelta(hours=1))
+        self.client.force_login(self.user)
+        self.assertEqual(200, self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code)
+        self.client.logout()
+        response = self.client.get(url)
+        self.assertEqual(response['Last-Modified'], http_date(published_date.timestamp()))
+
+    @override_settings(PAGE_CACHE_TIMEOUT=600)
+    def test_feeds(self):
+        """Check that feeds list excerpts of published posts, cached until posts change."""
+        Post.objects.create(author=self.user, title='Draft', text='draftText')
+        post = Post.objects.create(author=self.user, title='Test', text='superText ' * 100,
+                                   published_date=timezone.now())
+        for url, marker in [(reverse('post_feed_rss'), b'<rss'), (reverse('post_feed_atom'), b'<feed')]:
+            with self.assertNumQueries(4):
+                response = self.client.get(url)
+            self.assertIn(marker, response.content)
+            self.assertContains(response, post.excerpt)
+            self.assertNotContains(response, post.text.strip())
+            self.assertNotContains(response, 'Draft')
+            with self.assertNumQueries(0):
+                self.assertEqual(304, self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code)
+            post.title = 'Edited'
+            post.save()
+            self.assertContains(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']), 'Edited')
+
+    @skipUnless(has_full_text_index(), 'Full-text index is not available')
+    def test_search(self):
+        """Search finds published posts by title, text and approved comments, best matches first."""
+        now = timezone.now()
+        in_text = Post.objects.create(author=self.user, title='Other', text='all about kittens', published_date=now)
+        in_title = Post.objects.create(author=self.user, title='Kittens', text='superText', published_date=now)
+        Post.objects.create(author=self.user, title='Kittens draft', text='kittens')
+        commented = Post.objects.create(author=self.user, title='Test', text='superText', published_date=now)
+        comment = Comment.objects.create(post=commented, author='guest', text='I like kittens')
+        call_command('run_jobs', once=True, stdout=StringIO())
+
+        def found(query):
+            response = self.client.get(reverse('post_search'), {'q': query})
+            self.assertEqual(200, response.status_code)
+            return response.context['posts']
+
+        self.assertListEqual(found('kittens'), [in_title, in_text])
+        comment.approve()
+        # Comments are reindexed by background worker
+        self.assertListEqual(found('kitten'), [in_title, in_text])
+        call_command('run_jobs', once=True, stdout=StringIO())
+        self.assertListEqual(found('kitten'), [in_title, in_text, commented])
+        comment.delete()
+        call_command('run_jobs', once=True, stdout=StringIO())
+        in_text.delete()
+        in_title.text = 'puppies'
+        in_title.title = 'Puppies'
+        in_title.save()
+        call_command('run_jobs', once=True, stdout=StringIO())
+        self.assertListEqual(found('kittens'), [])
+        self.assertListEqual(found('"OR AND*'), [])
+        self.assertEqual(404, self.client.get(reverse('post_search'), {'q': 'puppies', 'page': 2}).status_code)
+
+    def test_search_without_full_text_index(self):
+        """Check that without full-text index published posts are found by title and text, newest first."""
+        now = timezone.now()
+        in_text = Post.objects.create(author=self.user, title='Other', text='all about kittens',
+                                      published_date=now - timedelta(hours=1))
+        in_title = Post.objects.create(author=self.user, title='Kittens', text='superText', published_date=now)
+        Post.objects.create(author=self.user, title='Kittens draft', text='kittens')
+        commented = Post.objects.create(author=self.user, title='Test', text='superText', published_date=now)
+        Comment.objects.create(post=commented, author='guest', text='I like kittens', is_approved=True)
+        with patch.dict(search._fts5, {'default': False}):
+            response = self.client.get(reverse('post_search'), {'q': 'Kittens'})
+        self.assertListEqual(response.context['posts'], [in_title, in_text])
 
     def test_post_new_view(self):
         """Testing new post view before and after login."""
@@ -96,15 +342,25 @@ class ViewsTest(TestCase):
 
     def test_publish_post(self):
         """Testing publishing post before login and after."""
-        response = self.client.get(reverse('post_publish', kwargs={'pk': 1}))
+        response = self.client.post(reverse('post_publish', kwargs={'pk': 1}))
         self.assertEqual(302, response.status_code)
         authorization = self.client.login(username=self.USERNAME, password=self.PASSWORD)
         self.assertTrue(authorization)
-        response = self.client.get(reverse('post_publish', kwargs={'pk': 1}))
+        response = self.client.post(reverse('post_publish', kwargs={'pk': 1}))
         self.assertEqual(404, response.status_code)
         post = Post.objects.create(author=self.user, title='Test', text='superText')
-        response = self.client.get(reverse('post_publish', kwargs={'pk': post.pk}), follow=True)
+        self.assertEqual(405, self.client.get(reverse('post_publish', kwargs={'pk': post.pk})).status_code)
+        response = self.client.post(reverse('post_publish', kwargs={'pk': post.pk}), follow=True)
         self.assertRedirects(response, reverse('post_detail', kwargs={'pk': post.pk}))
+        published_date = Post.objects.get(pk=post.pk).published_date
+        self.client.post(reverse('post_publish', kwargs={'pk': post.pk}))
+        self.assertEqual(Post.objects.get(pk=post.pk).published_date, published_date)
+        draft = Post.objects.create(author=self.user, title='Draft', text='superText')
+        url = reverse('post_publish', kwargs={'pk': draft.pk})
+        self.assertEqual(400, self.client.post(url, {'published_date': 'tomorrow'}).status_code)
+        response = self.client.post(url, {'published_date': '2116-04-01 10:00'}, follow=True)
+        self.assertContains(response, 'scheduled for')
+        self.assertNotIn(draft, Post.objects.published())
 
     def test_delete_post(self):
         """Testing deleting post before and after login."""
@@ -119,22 +375,51 @@ class ViewsTest(TestCase):
         self.assertRedirects(response, reverse('post_list'))
 
     def test_add_comment(self):
-        """Add comment to post."""
-        self.post = Post.objects.create(author=self.user, title='Test', text='superText')
+        """Add comment to post, readers can comment only published ones."""
+        draft = Post.objects.create(author=self.user, title='Draft', text='draftText')
+        response = self.client.post(reverse('add_comment_to_post', kwargs={'pk': draft.pk}),
+                                    {'author': 'guest', 'text': 'Super'})
+        self.assertEqual(404, response.status_code)
+        self.post = Post.objects.create(author=self.user, title='Test', text='superText', published_date=timezone.now())
         response = self.client.get(reverse('add_comment_to_post', kwargs={'pk': self.post.pk}))
         self.assertEqual(200, response.status_code)
         response = self.client.post(reverse('add_comment_to_post', kwargs={'pk': self.post.pk}),
                                     {'author': self.user, 'text': 'Super'}, follow=True)
         self.assertRedirects(response, reverse('post_detail', kwargs={'pk': self.post.pk}))
 
+    @override_settings(RATE_LIMITS={'comment_ip': (2, 1), 'comment_post': (3, 1), 'login_ip': (1, 1)},
+                       RATE_LIMIT_TRUSTED_PROXIES=1)
+    def test_rate_limits(self):
+        """Too many comments or logins are refused until tokens come back."""
+        post = Post.objects.create(author=self.user, title='Test', text='superText', published_date=timezone.now())
+        url = reverse('add_comment_to_post', kwargs={'pk': post.pk})
+        # Clients are told apart by the address proxy forwards, not the proxy's own one
+        for ip in ['10.0.0.1', '10.0.0.1', '10.0.0.2']:
+            response = self.client.post(url, {'author': 'guest', 'text': 'Super'}, HTTP_X_FORWARDED_FOR=ip)
+            self.assertEqual(302, response.status_code)
+        response = self.client.post(url, {'author': 'guest', 'text': 'Super'},
+                                    HTTP_X_FORWARDED_FOR='10.0.0.9, 10.0.0.1')
+        self.assertEqual(429, response.status_code)
+        self.assertEqual('60', response['Retry-After'])
+        # The post itself ran out of tokens, whoever comments
+        response = self.client.post(url, {'author': 'guest', 'text': 'Super'}, HTTP_X_FORWARDED_FOR='10.0.0.3')
+        self.assertEqual(429, response.status_code)
+        self.assertEqual(3, Comment.objects.count())
+        self.assertEqual(200, self.client.get(url, HTTP_X_FORWARDED_FOR='10.0.0.1').status_code)
+        credentials = {'username': self.USERNAME, 'password': 'wrong'}
+        self.assertEqual(200, self.client.post(reverse('login'), credentials).status_code)
+        self.assertEqual(429, self.client.post(reverse('login'), credentials).status_code)
+
     def test_comment_aprove(self):
         """Testing comment approve view."""
         self.post = Post.objects.create(author=self.user, title='Test', text='superText')
         self.comment = Comment.objects.create(post=self.post, author=self.user, text='superComment')
         authorization = self.client.login(username=self.USERNAME, password=self.PASSWORD)
         self.assertTrue(authorization)
-        response = self.client.get(reverse('comment_approve', kwargs={'pk': self.comment.pk}), follow=True)
+        self.assertEqual(405, self.client.get(reverse('comment_approve', kwargs={'pk': self.comment.pk})).status_code)
+        response = self.client.post(reverse('comment_approve', kwargs={'pk': self.comment.pk}), follow=True)
         self.assertRedirects(response, reverse('post_detail', kwargs={'pk': self.post.pk}))
+        self.assertTrue(Comment.objects.get(pk=self.comment.pk).is_approved)
 
     def test_comment_delete(self):
         """Testing delete comment view."""
@@ -145,6 +430,38 @@ class ViewsTest(TestCase):
         response = self.client.post(reverse('comment_remove', kwargs={'pk': self.comment.pk}), follow=True)
         self.assertRedirects(response, reverse('post_detail', kwargs={'pk': self.post.pk}))
 
+    def test_comment_moderation(self):
+        """Pending comments of all posts are approved or deleted in bulk by authors only."""
+        posts = [Post.objects.create(author=self.user, title=title, text='superText', published_date=timezone.now())
+                 for title in ['First', 'Second']]
+        comments = [Comment.objects.create(post=post, author='guest', text=text)
+                    for post in posts for text in ['good', 'spam']]
+        url = reverse('comment_moderation')
+        self.assertRedirects(self.client.get(url), '{}?next={}'.format(reverse('login'), url))
+        self.client.force_login(self.user)
+        response = self.client.get(url)
+        self.assertListEqual(list(response.context['comments']), comments)
+        self.assertContains(response, 'Second')
+        good = [comment.pk for comment in comments if comment.text == 'good']
+        spam = [comment.pk for comment in comments if comment.text == 'spam']
+        self.assertRedirects(self.client.post(url, {'action': 'approve', 'comments': good}), url)
+        self.assertRedirects(self.client.post(url, {'action': 'delete', 'comments': spam}), url)
+        self.assertEqual(400, self.client.post(url, {'action': 'publish', 'comments': good}).status_code)
+        self.assertListEqual(list(Comment.objects.values_list('pk', 'is_approved')), [(pk, True) for pk in good])
+        self.assertListEqual(list(Post.objects.values_list('comment_count', 'approved_comment_count')), [(1, 1)] * 2)
+        self.assertListEqual(list(self.client.get(url).context['comments']), [])
+
+    def test_comment_admin_actions(self):
+        """Check that comments are approved in bulk from the admin too."""
+        post = Post.objects.create(author=self.user, title='Test', text='superText', published_date=timezone.now())
+        comments = [Comment.objects.create(post=post, author='guest', text='good') for _ in range(3)]
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('admin:main_comment_changelist'), {
+            'action': 'approve_comments', '_selected_action': [comment.pk for comment in comments]})
+        self.assertEqual(302, response.status_code)
+        post.refresh_from_db()
+        self.assertEqual(post.approved_comment_count, 3)
+
     def tearDown(self):
         """Clean data after each test."""
         del self.client
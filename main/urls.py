@@ -1,16 +1,23 @@
 """main app URL configuration."""
 from django.conf.urls import url
-from . import views
+from . import api, feeds, views
 
 urlpatterns = [
     url(r'^$', views.PostList.as_view(), name='post_list'),
     url(r'^post/(?P<pk>\d+)/$', views.PostDetail.as_view(), name='post_detail'),
+    url(r'^search/$', views.SearchPosts.as_view(), name='post_search'),
+    url(r'^feed/rss/$', feeds.rss, name='post_feed_rss'),
+    url(r'^feed/atom/$', feeds.atom, name='post_feed_atom'),
+    url(r'^api/posts/$', api.PostListApi.as_view(), name='api_post_list'),
+    url(r'^api/posts/(?P<pk>\d+)/$', api.PostDetailApi.as_view(), name='api_post_detail'),
+    url(r'^api/posts/(?P<pk>\d+)/comments/$', api.CommentListApi.as_view(), name='api_comment_list'),
     url(r'^post/new/$', views.NewPost.as_view(), name='post_new'),
     url(r'^post/(?P<pk>\d+)/edit/$', views.EditPost.as_view(), name='post_edit'),
     url(r'^drafts/$', views.PostDraftList.as_view(), name='post_draft_list'),
     url(r'^post/(?P<pk>\d+)/publish/$', views.PublishPost.as_view(), name='post_publish'),
     url(r'^post/(?P<pk>\d+)/remove/$', views.RemovePost.as_view(), name='post_remove'),
     url(r'^post/(?P<pk>\d+)/comment/$', views.AddCommentToPost.as_view(), name='add_comment_to_post'),
+    url(r'^comments/pending/$', views.ModerateComments.as_view(), name='comment_moderation'),
     url(r'^comment/(?P<pk>\d+)/approve/$', views.ApproveComment.as_view(), name='comment_approve'),
     url(r'^comment/(?P<pk>\d+)/remove/$', views.RemoveComment.as_view(), name='comment_remove'),
 ]
@@ -1,13 +1,22 @@
 """All views are here."""
-from django.utils import timezone
+from django.conf import settings
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404, HttpResponseBadRequest
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.shortcuts import get_object_or_404, redirect
 from django.core.urlresolvers import reverse_lazy
+from django.db import transaction
+from django.views.decorators.http import condition
 from django.views.generic import DetailView, ListView, UpdateView, View, DeleteView, TemplateView, FormView
 
-from .forms import CommentForm, PostForm
+from . import search
+from .cache import LIST_VERSION, cache_for_anonymous, post_version
+from .conditional import post_etag, post_last_modified, post_list_etag, post_list_last_modified
+from .forms import CommentForm, ModerationForm, PostForm, PublishForm
 from .models import Post, Comment
+from .pagination import KeysetPaginationMixin, paginate_keyset
+from .ratelimit import client_ip, post_id, rate_limit
 
 
 class Protected(View):
@@ -19,23 +28,63 @@ class Protected(View):
         return super().dispatch(*args, **kwargs)
 
 
-class PostList(ListView):
-    """Show all your Post objects."""
+@method_decorator(cache_for_anonymous(lambda **kwargs: [LIST_VERSION]), name='dispatch')
+@method_decorator(condition(etag_func=post_list_etag, last_modified_func=post_list_last_modified), name='dispatch')
+class PostList(KeysetPaginationMixin, ListView):
+    """Show published posts page by page, newest first."""
 
+    replica_reads = True
     context_object_name = 'posts'
     template_name = 'main/index.html'
 
     def get_queryset(self):
-        """Return needed posts."""
-        return Post.objects.filter(published_date__lte=timezone.now())
+        """Return needed posts without their full texts."""
+        return Post.objects.listed()
 
 
+@method_decorator(cache_for_anonymous(lambda pk: [post_version(pk)]), name='dispatch')
+@method_decorator(condition(etag_func=post_etag, last_modified_func=post_last_modified), name='dispatch')
 class PostDetail(DetailView):
     """Show info about one post you have chosen."""
 
-    model = Post
+    replica_reads = True
     template_name = 'main/post_detail.html'
 
+    def get_queryset(self):
+        """Return published posts for readers, drafts and scheduled ones too for authors."""
+        posts = Post.objects.select_related('author')
+        return posts if self.request.user.is_authenticated() else posts.published()
+
+    def get_context_data(self, **kwargs):
+        """Add one page of comments, only approved ones for anonymous readers."""
+        context = super().get_context_data(**kwargs)
+        post = self.object
+        comments = post.comments.all() if self.request.user.is_authenticated() else post.approved_comments
+        context['comments'] = paginate_keyset(comments, 'created_date', settings.COMMENTS_PER_PAGE,
+                                              after=self.request.GET.get('after'),
+                                              before=self.request.GET.get('before'), descending=False)
+        return context
+
+
+class SearchPosts(TemplateView):
+    """Show published posts matching query, most relevant first."""
+
+    replica_reads = True
+    template_name = 'main/search.html'
+
+    def get_context_data(self, **kwargs):
+        """Find ids of matching posts and load posts of the requested page only."""
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '')
+        paginator = Paginator(search.search(query), settings.SEARCH_RESULTS_PER_PAGE)
+        try:
+            page = paginator.page(self.request.GET.get('page', 1))
+        except InvalidPage:
+            raise Http404('Invalid page.')
+        posts = Post.objects.defer('text', 'text_html').in_bulk(page.object_list)
+        context.update(query=query, page_obj=page, posts=[posts[pk] for pk in page.object_list if pk in posts])
+        return context
+
 
 class NewPost(FormView, Protected):
     """Return page for adding new Post."""
@@ -62,26 +111,33 @@ class EditPost(UpdateView, Protected):
     """View is for editing post."""
 
     model = Post
-    fields = ['title', 'text']
+    form_class = PostForm
     success_url = reverse_lazy('post_list')
     template_name = 'main/post_edit.html'
 
 
-class PostDraftList(ListView, Protected):
-    """Return draft list."""
+class PostDraftList(KeysetPaginationMixin, ListView, Protected):
+    """Return draft list, oldest first."""
 
-    queryset = Post.objects.filter(published_date__isnull=True).order_by('created_date')
+    queryset = Post.objects.filter(published_date__isnull=True).defer('text', 'text_html').order_by('created_date')
     context_object_name = 'posts'
     template_name = 'main/post_draft_list.html'
+    keyset_field = 'created_date'
+    keyset_descending = False
 
 
-class PublishPost(Protected, TemplateView):
-    """View for publishing post."""
+class PublishPost(Protected, View):
+    """View for publishing post, accepting POST only so following a link changes nothing."""
 
-    def get(self, request, *args, **kwargs):
-        """Get info about POst pk that we use."""
-        post = get_object_or_404(Post, pk=kwargs['pk'])
-        post.publish()
+    def post(self, request, *args, **kwargs):
+        """Publish post at the time given in the form, now if it is empty."""
+        form = PublishForm(request.POST)
+        if not form.is_valid():
+            return HttpResponseBadRequest('Invalid publishing date.')
+        with transaction.atomic():
+            # Concurrent requests wait for the row lock and find the post published
+            post = get_object_or_404(Post.objects.select_for_update().defer('text', 'text_html'), pk=kwargs['pk'])
+            post.publish(form.cleaned_data['published_date'])
         return redirect('post_detail', pk=post.pk)
 
 
@@ -93,6 +149,7 @@ class RemovePost(Protected, DeleteView):
     template_name = 'main/post_edit.html'
 
 
+@method_decorator(rate_limit(('comment_ip', client_ip), ('comment_post', post_id)), name='dispatch')
 class AddCommentToPost(FormView):
     """If someone wants to create new comment he/she get this view."""
 
@@ -100,8 +157,9 @@ class AddCommentToPost(FormView):
     template_name = 'main/post_edit.html'
 
     def post(self, request, *args, **kwargs):
-        """Add comment to DB."""
-        post = get_object_or_404(Post, pk=kwargs['pk'])
+        """Add comment to DB, only published posts can be commented by readers."""
+        posts = Post.objects.all() if request.user.is_authenticated() else Post.objects.published()
+        post = get_object_or_404(posts, pk=kwargs['pk'])
         form = CommentForm(request.POST)
         if form.is_valid():
             comment = form.save(commit=False)
@@ -110,14 +168,40 @@ class AddCommentToPost(FormView):
             return redirect('post_detail', pk=post.pk)
 
 
-class ApproveComment(Protected, TemplateView):
-    """Moderate comment."""
+class ApproveComment(Protected, View):
+    """Moderate comment, accepting POST only so following a link changes nothing."""
 
-    def get(self, request, *args, **kwargs):
-        """Approve comment and update info in DB."""
-        comment = get_object_or_404(Comment, pk=kwargs['pk'])
-        comment.approve()
-        return redirect('post_detail', pk=comment.post.pk)
+    def post(self, request, *args, **kwargs):
+        """Approve comment, approving it again does nothing."""
+        with transaction.atomic():
+            comment = get_object_or_404(Comment.objects.select_for_update().only('post', 'is_approved'),
+                                        pk=kwargs['pk'])
+            comment.approve()
+        return redirect('post_detail', pk=comment.post_id)
+
+
+class ModerateComments(Protected, KeysetPaginationMixin, ListView):
+    """Show pending comments of all posts, oldest first, to approve or delete many at once."""
+
+    queryset = Comment.objects.pending().select_related('post').only('author', 'text', 'created_date', 'post',
+                                                                     'post__title')
+    context_object_name = 'comments'
+    template_name = 'main/comment_moderation.html'
+    keyset_field = 'created_date'
+    keyset_descending = False
+    paginate_by_setting = 'MODERATION_PAGE_SIZE'
+
+    def post(self, request, *args, **kwargs):
+        """Approve or delete chosen comments in one transaction and show the queue again."""
+        form = ModerationForm(request.POST)
+        if not form.is_valid():
+            return HttpResponseBadRequest('Invalid comments or action.')
+        comments = form.cleaned_data['comments']
+        if form.cleaned_data['action'] == ModerationForm.APPROVE:
+            comments.approve()
+        else:
+            comments.delete()
+        return redirect('comment_moderation')
 
 
 class RemoveComment(Protected, DeleteView):